@@ -0,0 +1,222 @@
+import json
+from base64 import b64encode
+from inspect import isclass
+from typing import Dict, Any, AsyncIterator, Callable, List, Type, Union, Iterable
+
+import aiohttp
+from arango.exceptions import ArangoServerError
+from arango.request import Request
+from arango.response import Response
+
+from _codec import Codec, get_codec
+from _collection import Collection, EdgeCollection, Index
+from _compiled import PreparedQuery
+from _db import BaseDB, TDocument, TEdge
+from _document import Document
+from _plan import QueryPlan, get_query_plan
+from _query import Query
+
+INDEX_OPTION_TO_API_OPTION = {'expiry_time': 'expireAfter', 'min_length': 'minLength', 'ordered': 'geoJson'}
+
+
+class AsyncDB(BaseDB):
+    """
+    asyncio counterpart of DB, talking to the ArangoDB HTTP API through aiohttp.
+    Collections and the graph are ensured lazily, the first time they are used.
+    """
+
+    def __init__(self, db_name: str, username: str, password: str, graph_name: str = 'main',
+                 hosts: str = 'http://127.0.0.1:8529', serializer: Callable[[Any], str] = json.dumps,
+                 deserializer: Callable[[str], Any] = json.loads, stmt_cache_size: int = 128,
+                 session: aiohttp.ClientSession = None, codec: Union[str, Codec] = None):
+        super().__init__(stmt_cache_size=stmt_cache_size)
+        if codec:
+            codec = get_codec(codec)
+            serializer, deserializer = codec.serializer, codec.deserializer
+
+        self.url = f'{hosts.rstrip("/")}/_db/{db_name}'
+        credentials = b64encode(f'{username}:{password}'.encode()).decode()
+        self.headers = {'content-type': 'application/json', 'authorization': f'Basic {credentials}'}
+        self.graph_name = graph_name
+        self.serializer = serializer
+        self.deserializer = deserializer
+        self.session = session
+        self._owns_session = session is None
+        self._has_graph = False
+        self._collection_names = set()
+        self._edge_collection_names = set()
+
+    async def __aenter__(self) -> 'AsyncDB':
+        return self
+
+    async def __aexit__(self, *_):
+        await self.close()
+
+    async def close(self):
+        if self._owns_session and self.session:
+            await self.session.close()
+            self.session = None
+
+    async def _request(self, method: str, endpoint: str, data: Any = None, ignore_status: Iterable[int] = ()) -> Any:
+        if self.session is None:
+            self.session = aiohttp.ClientSession()
+
+        async with self.session.request(method, self.url + endpoint, headers=self.headers,
+                                        data=None if data is None else self.serializer(data)) as http_response:
+            raw_body = await http_response.text()
+
+        response = Response(method, str(http_response.url), http_response.headers, http_response.status,
+                            http_response.reason, raw_body)
+        response.body = self.deserializer(raw_body) if raw_body else None
+        if isinstance(response.body, dict):
+            response.error_code = response.body.get('errorNum')
+            response.error_message = response.body.get('errorMessage')
+        response.is_success = 200 <= response.status_code < 300 and response.error_code is None
+
+        if response.is_success:
+            return response.body
+
+        if response.status_code in ignore_status:
+            return None
+
+        raise ArangoServerError(response, Request(method, endpoint, data=data))
+
+    async def with_collections(self, *collections: Type) -> 'AsyncDB':
+        for collection in self._get_collections(*collections):
+            if isinstance(collection, EdgeCollection):
+                await self._ensure_edge_collection(collection)
+            else:
+                await self._ensure_collection(collection)
+                for index in collection.indexes:
+                    await self._ensure_index(collection, index)
+
+            self.collection_definition[collection.name] = collection
+
+        return self
+
+    async def _ensure_graph(self):
+        if self._has_graph:
+            return
+
+        if await self._request('get', f'/_api/gharial/{self.graph_name}', ignore_status=(404,)) is None:
+            await self._request('post', '/_api/gharial', {'name': self.graph_name}, ignore_status=(409,))
+
+        self._has_graph = True
+
+    async def _ensure_edge_collection(self, edge_collection: EdgeCollection):
+        if edge_collection.name in self._edge_collection_names:
+            return
+
+        await self._ensure_graph()
+        edge_definitions = await self._request('get', f'/_api/gharial/{self.graph_name}/edge')
+
+        if edge_collection.name not in edge_definitions['collections']:
+            await self._request('post', f'/_api/gharial/{self.graph_name}/edge', {
+                'collection': edge_collection.name,
+                'from': [from_collection.name for from_collection in edge_collection.from_collections],
+                'to': [to_collection.name for to_collection in edge_collection.to_collections]
+            }, ignore_status=(409,))
+
+        for index in edge_collection.indexes:
+            await self._ensure_index(edge_collection, index)
+
+        self._edge_collection_names.add(edge_collection.name)
+
+    async def _ensure_collection(self, collection: Collection):
+        if collection.name in self._collection_names:
+            return
+
+        if await self._request('get', f'/_api/collection/{collection.name}', ignore_status=(404,)) is None:
+            await self._request('post', '/_api/collection', {'name': collection.name}, ignore_status=(409,))
+
+        self._collection_names.add(collection.name)
+
+    async def _ensure_index(self, collection: Collection, index: Index):
+        # index creation is idempotent on the server, an existing equal index is returned as is
+        data = {'type': index.type, 'fields': index.fields}
+        data.update({INDEX_OPTION_TO_API_OPTION.get(option, option): value for option, value in index.options.items()
+                     if value is not None})
+        await self._request('post', f'/_api/index?collection={collection.name}', data)
+
+    async def iter(self, query: Union[Query, PreparedQuery], params: Dict[str, Any] = None, batch_size: int = 1000,
+                   stream: bool = True, ttl: int = None) -> AsyncIterator[Any]:
+        compiled, bind_vars = self._compile(query, params=params)
+        body = {'query': compiled.query_str, 'bindVars': bind_vars, 'batchSize': batch_size,
+                'options': {'stream': stream}}
+        if ttl is not None:
+            body['ttl'] = ttl
+
+        cursor = await self._request('post', '/_api/cursor', body)
+        load = compiled.get_loader(self.collection_definition)
+
+        try:
+            while True:
+                for data in cursor['result']:
+                    yield load(data)
+
+                if not cursor['hasMore']:
+                    break
+
+                cursor = await self._request('put', f'/_api/cursor/{cursor["id"]}')
+        finally:
+            if cursor['hasMore']:
+                await self._request('delete', f'/_api/cursor/{cursor["id"]}', ignore_status=(404,))
+
+    async def get(self, query: Union[Query, PreparedQuery], params: Dict[str, Any] = None) -> Any:
+        results = self.iter(query, params, stream=False)
+
+        try:
+            async for result in results:
+                return result
+        finally:
+            await results.aclose()
+
+    async def get_many(self, query: Union[Query, PreparedQuery], params: Dict[str, Any] = None) -> List[Any]:
+        return [result async for result in self.iter(query, params, stream=False)]
+
+    async def explain(self, query: Union[Query, PreparedQuery], params: Dict[str, Any] = None) -> QueryPlan:
+        compiled, bind_vars = self._compile(query, params=params)
+        explain_result = await self._request('post', '/_api/explain',
+                                             {'query': compiled.query_str, 'bindVars': bind_vars})
+        return get_query_plan(compiled.query_str, explain_result)
+
+    async def add(self, document: TDocument) -> TDocument:
+        collection = document._get_collection()
+        await self._ensure_collection(collection)
+        result = await self._request('post', f'/_api/document/{collection.name}', document._dump())
+        document._set_meta(_id=result['_id'], _key=result['_key'], _rev=result['_rev'])
+        return document
+
+    async def update(self, document: TDocument) -> TDocument:
+        collection = document._get_collection()
+        await self._ensure_collection(collection)
+        # like DB.update, a document whose _rev is no longer the stored one is rejected
+        result = await self._request('patch', f'/_api/document/{collection.name}/{document._key}?ignoreRevs=false',
+                                     document._dump())
+        document._set_meta(_id=result['_id'], _key=result['_key'], _rev=result['_rev'])
+        return document
+
+    async def set(self, from_: Union[Query, Document], edge_document: Union[Type, TEdge],
+                  to_: Union[Query, Document], data: Dict[str, Any] = None):
+        edge_collection = edge_document._get_collection()
+        await self._ensure_edge_collection(edge_collection)
+
+        if isinstance(from_, Document) and isinstance(to_, Document):
+            return await self._set_from_objects(from_, to_, edge_document, data)
+
+        statement, bind_vars = self._get_set_stmt(from_, edge_document, to_, data)
+        await self._request('post', '/_api/cursor', {'query': statement, 'bindVars': bind_vars})
+
+    async def _set_from_objects(self, from_, to_, edge_document, data):
+        edge_collection_name = edge_document._get_collection().name
+
+        if isclass(edge_document):
+            edge = Document._dump_from_dict(dict(data or {}), Document.INIT_PROPERTIES)
+            edge.update(_from=from_._id, _to=to_._id)
+            return await self._request('post', f'/_api/document/{edge_collection_name}', edge)
+
+        edge_document._from = from_._id
+        edge_document._to = to_._id
+
+        result = await self._request('post', f'/_api/document/{edge_collection_name}', edge_document._dump())
+        edge_document._set_meta(_id=result['_id'], _key=result['_key'], _rev=result['_rev'])
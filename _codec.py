@@ -0,0 +1,44 @@
+import json
+from dataclasses import dataclass
+from typing import Callable, Any, Dict, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+@dataclass(frozen=True)
+class Codec:
+    name: str
+    serializer: Callable[[Any], str]
+    deserializer: Callable[[str], Any]
+
+
+CODECS: Dict[str, Codec] = {}
+
+
+def register_codec(codec: Codec) -> Codec:
+    CODECS[codec.name] = codec
+    return codec
+
+
+def get_codec(codec: Union[str, Codec]) -> Codec:
+    if isinstance(codec, Codec):
+        return codec
+
+    if codec not in CODECS:
+        raise ValueError(f'unknown codec {codec}, available codecs are {", ".join(CODECS)}')
+
+    return CODECS[codec]
+
+
+# datetimes are encoded with str(), like Document._dump_from_dict does
+register_codec(Codec('json', lambda value: json.dumps(value, default=str), json.loads))
+
+if orjson:
+    register_codec(Codec(
+        'orjson',
+        lambda value: orjson.dumps(value, default=str, option=orjson.OPT_PASSTHROUGH_DATETIME).decode(),
+        orjson.loads
+    ))
@@ -1,16 +1,69 @@
 from abc import ABC
-from dataclasses import dataclass
-from typing import List, Type
+from dataclasses import dataclass, field
+from typing import List, Type, Dict, Any
+
+
+INDEX_TYPE_ALIASES = {'hash': 'persistent', 'skiplist': 'persistent', 'geo1': 'geo', 'geo2': 'geo'}
+# the options compared with an existing index, by the names python-arango reports them with
+INDEX_TYPE_TO_OPTIONS = {
+    'persistent': {'unique': 'unique', 'sparse': 'sparse'},
+    'ttl': {'expiry_time': 'expiry_time'},
+    'fulltext': {'min_length': 'min_length'},
+    'geo': {'ordered': 'geo_json'},
+}
+
+
+@dataclass
+class Index:
+    type: str
+    fields: List[str]
+    options: Dict[str, Any] = field(default_factory=dict)
+
+    def _matches(self, index: Dict[str, Any]) -> bool:
+        # hash and skiplist indexes are created as persistent ones by the server, and old servers report geo indexes
+        # as geo1 or geo2
+        index_type = INDEX_TYPE_ALIASES.get(index['type'], index['type'])
+        this_type = INDEX_TYPE_ALIASES.get(self.type, self.type)
+        if index_type != this_type or list(index['fields']) != self.fields:
+            return False
+
+        # only the options of the index type are compared, e.g. ttl, geo and fulltext indexes are always sparse
+        for option, reported_option in INDEX_TYPE_TO_OPTIONS.get(this_type, {}).items():
+            value = self.options.get(option)
+            if value is not None and index.get(reported_option, False) != value:
+                return False
+
+        return True
+
+def persistent_index(*fields: str, unique: bool = False, sparse: bool = False) -> Index:
+    return Index(type='persistent', fields=list(fields), options={'unique': unique, 'sparse': sparse})
+
+
+def hash_index(*fields: str, unique: bool = False, sparse: bool = False) -> Index:
+    return Index(type='hash', fields=list(fields), options={'unique': unique, 'sparse': sparse})
+
+
+def ttl_index(field_name: str, expire_after: int) -> Index:
+    return Index(type='ttl', fields=[field_name], options={'expiry_time': expire_after})
+
+
+def fulltext_index(field_name: str, min_length: int = None) -> Index:
+    return Index(type='fulltext', fields=[field_name], options={'min_length': min_length})
+
+
+def geo_index(*fields: str, geo_json: bool = False) -> Index:
+    return Index(type='geo', fields=list(fields), options={'ordered': geo_json})
 
 
 @dataclass
 class Collection(ABC):
     name: str
     document_type: Type['Document']
+    indexes: List[Index] = field(default_factory=list)
 
 
 @dataclass
 class EdgeCollection(Collection):
     edge_filter_generator = None
-    from_collections: List[Collection]
-    to_collections: List[Collection]
+    from_collections: List[Collection] = field(default_factory=list)
+    to_collections: List[Collection] = field(default_factory=list)
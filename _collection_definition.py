@@ -1,10 +1,39 @@
-from typing import List, Type
+from dataclasses import is_dataclass, fields
+from typing import List, Type, Dict, Any
 
-from _collection import Collection, EdgeCollection
+from _collection import Collection, EdgeCollection, Index
 from _document import Document, Edge
 
 
-def collection(collection_name: str):
+def _get_field_names(_cls) -> List[str]:
+    if is_dataclass(_cls):
+        return [f.name for f in fields(_cls)]
+
+    return list(getattr(_cls, '__annotations__', {}))
+
+
+def _set_slots(class_dict: Dict[str, Any], _cls, base: Type[Document]):
+    # slots replace the class attributes holding dataclass defaults, which are already bound in __init__. Other
+    # classes must annotate every attribute their __init__ sets, as those are the only ones known to become slots
+    field_names = _get_field_names(_cls)
+
+    if not is_dataclass(_cls):
+        if not field_names:
+            raise TypeError(f'{_cls.__name__} needs annotations of its attributes or to be a dataclass to use slots')
+
+        defaults = [name for name in field_names if name in class_dict]
+        if defaults:
+            raise TypeError(f'{_cls.__name__} can not use slots with the class attributes {", ".join(defaults)}')
+
+    slot_names = list(dict.fromkeys(base.INIT_PROPERTIES + field_names))
+
+    for name in slot_names + ['__weakref__']:
+        class_dict.pop(name, None)
+
+    class_dict['__slots__'] = tuple(slot_names + ['__weakref__'])
+
+
+def collection(collection_name: str, indexes: List[Index] = None, slots: bool = False):
     def create_class(_cls):
 
         class_dict = dict(_cls.__dict__)
@@ -24,10 +53,13 @@ def collection(collection_name: str):
 
         @classmethod
         def _get_collection(cls):
-            return Collection(name=collection_name, document_type=cls)
+            return Collection(name=collection_name, document_type=cls, indexes=list(indexes or []))
 
         class_dict['_get_collection'] = _get_collection
         del class_dict['__dict__']
+        if slots:
+            _set_slots(class_dict, _cls, Document)
+
         NewClass = type(_cls.__name__, (Document,), class_dict)
 
         return NewClass
@@ -35,7 +67,8 @@ def collection(collection_name: str):
     return create_class
 
 
-def edge_collection(collection_name: str, from_collections: List[Type], to_collections: List[Type]):
+def edge_collection(collection_name: str, from_collections: List[Type], to_collections: List[Type],
+                    indexes: List[Index] = None, slots: bool = False):
     def create_class(_cls):
 
         class_dict = dict(_cls.__dict__)
@@ -43,7 +76,7 @@ def edge_collection(collection_name: str, from_collections: List[Type], to_colle
         def __init__(self, *args, **kwargs):
             this_kwargs, super_kwargs = {}, {}
             for key, value in kwargs.items():
-                if key in Document.INIT_PROPERTIES:
+                if key in Edge.INIT_PROPERTIES:
                     super_kwargs[key] = value
                 else:
                     this_kwargs[key] = value
@@ -57,10 +90,14 @@ def edge_collection(collection_name: str, from_collections: List[Type], to_colle
         def _get_collection(cls):
             return EdgeCollection(name=collection_name, document_type=cls,
                                   from_collections=[c._get_collection() for c in from_collections],
-                                  to_collections=[c._get_collection() for c in to_collections])
+                                  to_collections=[c._get_collection() for c in to_collections],
+                                  indexes=list(indexes or []))
 
         class_dict['_get_collection'] = _get_collection
         del class_dict['__dict__']
+        if slots:
+            _set_slots(class_dict, _cls, Edge)
+
         NewClass = type(_cls.__name__, (Edge,), class_dict)
 
         return NewClass
@@ -0,0 +1,226 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, fields, is_dataclass
+from typing import Any, Callable, Dict, Hashable, List, MutableMapping, Tuple, Union
+
+from _query import Query, AttributeFilter, BoundValue, Var, Param, Returns, Filter, Aliased, Grouped, Selected
+from _collection import Collection
+from _result import Result
+
+
+@dataclass(frozen=True)
+class _Slot:
+    index: int
+
+
+@dataclass
+class CompiledStmt:
+    query_str: str
+    bind_vars: Dict[str, Any]
+    result: Result
+    value_slots: Dict[str, int]
+    param_slots: Dict[str, str]
+    _loader: Tuple[Dict[str, Collection], MutableMapping[str, Any], Callable[[Any], Any]] = field(
+        default=(None, None, None), init=False, repr=False, compare=False)
+
+    def get_loader(self, collection_definition: Dict[str, Collection],
+                   identity_map: MutableMapping[str, Any] = None) -> Callable[[Any], Any]:
+        """
+        Returns the loader of the result, built once per collection definition and identity map and reused across
+        executions.
+        """
+        loader_collection_definition, loader_identity_map, loader = self._loader
+        if loader_collection_definition is not collection_definition or loader_identity_map is not identity_map:
+            loader = self.result._get_loader(collection_definition, identity_map)
+            self._loader = (collection_definition, identity_map, loader)
+
+        return loader
+
+    def bind(self, values: List[Any], params: Dict[str, Any] = None) -> Dict[str, Any]:
+        bind_vars = dict(self.bind_vars)
+
+        for bind_var, index in self.value_slots.items():
+            bind_vars[bind_var] = values[index]
+
+        return self._bind_params(bind_vars, params)
+
+    def _bind_params(self, bind_vars: Dict[str, Any], params: Dict[str, Any] = None) -> Dict[str, Any]:
+        if not self.param_slots:
+            return bind_vars
+
+        if not params:
+            params = {}
+
+        try:
+            for bind_var, name in self.param_slots.items():
+                bind_vars[bind_var] = params[name]
+        except KeyError as e:
+            raise ValueError(f'missing query parameter {e}') from None
+
+        return bind_vars
+
+
+@dataclass
+class PreparedQuery:
+    compiled: CompiledStmt
+    bind_vars: Dict[str, Any]
+
+    @property
+    def params(self) -> List[str]:
+        return list(dict.fromkeys(self.compiled.param_slots.values()))
+
+    def bind(self, params: Dict[str, Any] = None) -> Dict[str, Any]:
+        return self.compiled._bind_params(dict(self.bind_vars), params)
+
+
+_type_to_field_names: Dict[type, Tuple[str, ...]] = {}
+
+
+def _get_field_names(node_type: type) -> Tuple[str, ...]:
+    field_names = _type_to_field_names.get(node_type)
+
+    if field_names is None:
+        field_names = _type_to_field_names[node_type] = tuple(f.name for f in fields(node_type))
+
+    return field_names
+
+
+def _get_shape(node: Any, filters: List[Union[AttributeFilter, BoundValue]]) -> Hashable:
+    if isinstance(node, AttributeFilter) and not isinstance(node.compare_value, (Var, Param)):
+        filters.append(node)
+        return AttributeFilter, node.attribute, node.operator
+
+    if isinstance(node, BoundValue) and not isinstance(node.compare_value, Param):
+        filters.append(node)
+        return BoundValue
+
+    if is_dataclass(node) and not isinstance(node, type):
+        node_type = type(node)
+        return (node_type,) + tuple(_get_shape(getattr(node, name), filters) for name in _get_field_names(node_type))
+
+    if isinstance(node, (list, tuple)):
+        return (list,) + tuple(_get_shape(item, filters) for item in node)
+
+    if isinstance(node, dict):
+        return (dict,) + tuple((key, _get_shape(value, filters)) for key, value in node.items())
+
+    return node
+
+
+def get_shape(query: Query,
+              prefix: str = 'p') -> Tuple[Union[Hashable, None], List[Union[AttributeFilter, BoundValue]]]:
+    """
+    Returns a hashable key describing the structure of the query, leaving out the values it filters and limits by,
+    and the filters and bound values holding those values in the order they fill the slots of the compiled statement.
+    The key is None when part of the query can not be hashed.
+    """
+    filters = []
+    shape = (prefix, _get_shape(query, filters))
+
+    try:
+        hash(shape)
+    except TypeError:
+        return None, filters
+
+    return shape, filters
+
+
+_NODE_TYPES = (Returns, Filter, Aliased, Grouped, Selected, BoundValue)
+
+
+def _copy_with_slots(node: Any, filter_id_to_slot: Dict[int, _Slot], memo: Dict[int, Any]) -> Any:
+    # the query nodes are copied, nodes referenced twice once, with the slots in the copies of the filters
+    if id(node) in memo:
+        return memo[id(node)]
+
+    if isinstance(node, _NODE_TYPES):
+        copied = memo[id(node)] = object.__new__(type(node))
+        vars(copied).update((name, _copy_with_slots(value, filter_id_to_slot, memo))
+                            for name, value in vars(node).items())
+        if id(node) in filter_id_to_slot:
+            copied.compare_value = filter_id_to_slot[id(node)]
+
+        return copied
+
+    if isinstance(node, list):
+        copied = memo[id(node)] = []
+        copied.extend(_copy_with_slots(item, filter_id_to_slot, memo) for item in node)
+        return copied
+
+    if isinstance(node, tuple):
+        return tuple(_copy_with_slots(item, filter_id_to_slot, memo) for item in node)
+
+    if isinstance(node, dict):
+        copied = memo[id(node)] = {}
+        copied.update((key, _copy_with_slots(value, filter_id_to_slot, memo)) for key, value in node.items())
+        return copied
+
+    return node
+
+
+def compile_stmt(query: Query, filters: List[Union[AttributeFilter, BoundValue]], prefix: str = 'p') -> CompiledStmt:
+    """
+    Compiles the query with every filter value replaced by a slot, so the statement can be reused by any query of
+    the same shape. A copy of the query is compiled, so queries can be compiled and bound from many threads.
+    """
+    filter_id_to_slot = {id(f): _Slot(index) for index, f in enumerate(filters)}
+    stmt = _copy_with_slots(query, filter_id_to_slot, {})._to_stmt(prefix=prefix)
+    query_str, bind_vars = stmt.expand()
+
+    value_slots, param_slots = {}, {}
+    for bind_var, value in bind_vars.items():
+        if isinstance(value, _Slot):
+            value_slots[bind_var] = value.index
+        elif isinstance(value, Param):
+            param_slots[bind_var] = value.name
+
+    return CompiledStmt(query_str, bind_vars, result=stmt.result, value_slots=value_slots, param_slots=param_slots)
+
+
+def prepare(query: Query, prefix: str = 'p') -> PreparedQuery:
+    """
+    Compiles the query once so it can be executed many times by only binding the values of its `param`s.
+    """
+    _, filters = get_shape(query, prefix)
+    compiled = compile_stmt(query, filters, prefix)
+    bind_vars = dict(compiled.bind_vars)
+
+    for bind_var, index in compiled.value_slots.items():
+        bind_vars[bind_var] = filters[index].compare_value
+
+    return PreparedQuery(compiled, bind_vars)
+
+
+class StmtCache:
+    """LRU cache of compiled statements keyed on query shape, safe to share between threads."""
+
+    def __init__(self, max_size: int = 128):
+        self.max_size = max_size
+        self._shape_to_compiled: 'OrderedDict[Hashable, CompiledStmt]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._shape_to_compiled)
+
+    def clear(self):
+        self._shape_to_compiled.clear()
+
+    def get(self, query: Query, prefix: str = 'p',
+            params: Dict[str, Any] = None) -> Tuple[CompiledStmt, Dict[str, Any]]:
+        shape, filters = get_shape(query, prefix)
+
+        if shape is None or self.max_size <= 0:
+            compiled = compile_stmt(query, filters, prefix)
+            return compiled, compiled.bind([f.compare_value for f in filters], params)
+
+        with self._lock:
+            compiled = self._shape_to_compiled.get(shape)
+
+            if compiled is None:
+                compiled = self._shape_to_compiled[shape] = compile_stmt(query, filters, prefix)
+                if len(self._shape_to_compiled) > self.max_size:
+                    self._shape_to_compiled.popitem(last=False)
+            else:
+                self._shape_to_compiled.move_to_end(shape)
+
+        return compiled, compiled.bind([f.compare_value for f in filters], params)
@@ -1,39 +1,149 @@
 import json
-import itertools
+from concurrent.futures import ThreadPoolExecutor
 from inspect import isclass
-from typing import Dict, Iterable, Any, List, Union, Type, Callable, TypeVar
+from time import perf_counter
+from typing import Dict, Iterable, Iterator, Any, List, Union, Type, Callable, TypeVar, Tuple, Generator, MutableMapping
 
 from arango import ArangoClient
 from arango.graph import Graph
+from arango.exceptions import AQLQueryExplainError
+from arango.http import HTTPClient
+from arango.request import Request
 from arango.collection import Collection as ArangoCollection, EdgeCollection as ArangoEdgeCollection
+from requests.adapters import DEFAULT_POOLSIZE
 from _collection import Collection, EdgeCollection
-from _document import Document, Edge
+from _document import Document
 from _stmt import Stmt
 from _query import Query
+from _codec import Codec, get_codec
+from _compiled import StmtCache, CompiledStmt, PreparedQuery
+from _plan import QueryPlan, get_query_plan
+from _profile import QueryProfile
+from _http import PooledHTTPClient
+from _utils import chunks
 
 TEdge = TypeVar('TEdge', bound='Edge')
 TDocument = TypeVar('TDocument', bound='Document')
 
 
-class DB:
-    def __init__(self, db_name: str, username: str, password: str, graph_name: str = 'main',
-                 serializer: Callable[[Any], str] = json.dumps, deserializer: Callable[[str], Any] = json.loads):
-        self.client = ArangoClient(serializer=serializer, deserializer=deserializer)
-        self.db = self.client.db(db_name, username=username, password=password)
+class BulkInsertError(ValueError):
+    """Raised by add_many once every chunk is sent, with the documents which failed and their errors, in order."""
+
+    def __init__(self, failures: List[Tuple[Document, Exception]]):
+        super().__init__(f'{len(failures)} documents failed to insert, first error: {failures[0][1]}')
+        self.failures = failures
+
+    @property
+    def documents(self) -> List[Document]:
+        return [document for document, _ in self.failures]
+
+
+class BaseDB:
+    """Compiles queries and statements for the database clients, independently of how they are sent."""
+
+    def __init__(self, stmt_cache_size: int = 128):
         self.collection_definition = {}
-        self.graph = self._ensure_graph(graph_name)
+        self.stmt_cache = StmtCache(max_size=stmt_cache_size)
 
-    def with_collections(self, *collections: Type) -> 'DB':
+    @staticmethod
+    def _get_collections(*collections: Type) -> List[Collection]:
         for document_type in collections:
             if not issubclass(document_type, Document):
                 raise TypeError(f'{document_type} is not a document type')
 
-            collection = document_type._get_collection()
-            if issubclass(document_type, Edge):
+        return [document_type._get_collection() for document_type in collections]
+
+    def _compile(self, query: Union[Query, PreparedQuery], prefix: str = 'p',
+                 params: Dict[str, Any] = None) -> Tuple[CompiledStmt, Dict[str, Any]]:
+        if isinstance(query, PreparedQuery):
+            return query.compiled, query.bind(params)
+
+        return self.stmt_cache.get(query, prefix=prefix, params=params)
+
+    def _expand(self, query: Union[Query, PreparedQuery], prefix: str = 'p',
+                params: Dict[str, Any] = None) -> Tuple[str, Dict[str, Any]]:
+        compiled, bind_vars = self._compile(query, prefix=prefix, params=params)
+        return compiled.query_str, bind_vars
+
+    def _get_set_stmt(self, from_: Union[Query, Document], edge_document: Union[Type, TEdge],
+                      to_: Union[Query, Document], data: Dict[str, Any] = None) -> Tuple[str, Dict[str, Any]]:
+        bind_vars = {}
+
+        from_str, from_bind_vars = self._expand(from_, prefix='from_p') if isinstance(from_, Query) else Stmt(
+            f'[{{_id: @from_id}}]', bind_vars={'from_id': from_._id}).expand()
+        bind_vars.update(from_bind_vars)
+        to_str, to_bind_vars = self._expand(to_, prefix='to_p') if isinstance(to_, Query) else Stmt(
+            f'[{{_id: @to_id}}]', bind_vars={'to_id': to_._id}).expand()
+        bind_vars.update(to_bind_vars)
+
+        if isclass(edge_document):
+            dict_doc = Document._dump_from_dict(data, Document.INIT_PROPERTIES)
+        else:
+            dict_doc = edge_document._dump()
+
+        for key, value in dict_doc.items():
+            bind_vars[f'edge_{key}'] = value
+
+        statement = f'''
+        LET from_entities = ({from_str})
+        LET to_entities = ({to_str})
+        FOR from_entity IN from_entities
+            FOR to_entity IN to_entities
+                insert {{_from: from_entity._id, _to: to_entity._id{',' if len(dict_doc) > 0 else ''} {', '.join([f'{key}: @edge_{key}' for key in dict_doc.keys()])}}} INTO {edge_document._get_collection().name}
+        '''
+
+        return statement, bind_vars
+
+
+class DB(BaseDB):
+    """
+    Pass an ArangoClient as `client` to share its connection pools between DB instances, e.g. one per database;
+    otherwise a client is created for `hosts` with the given `http_client`, serializer and deserializer, or those of
+    `codec`, a registered codec name such as 'orjson' or a Codec.
+    Every hook in `hooks` is called with a QueryProfile once a query's results are consumed; with `profile`,
+    queries are also profiled by the server.
+    """
+
+    def __init__(self, db_name: str, username: str, password: str, graph_name: str = 'main',
+                 serializer: Callable[[Any], str] = None, deserializer: Callable[[str], Any] = None,
+                 stmt_cache_size: int = 128, hosts: Union[str, List[str]] = None,
+                 http_client: HTTPClient = None, client: ArangoClient = None,
+                 hooks: List[Callable[[QueryProfile], None]] = None, profile: bool = False,
+                 codec: Union[str, Codec] = None):
+        super().__init__(stmt_cache_size=stmt_cache_size)
+        self.hooks = list(hooks or [])
+        self.profile = profile
+
+        if client:
+            client_options = {'hosts': hosts, 'http_client': http_client, 'serializer': serializer,
+                              'deserializer': deserializer, 'codec': codec}
+            ignored_options = [name for name, value in client_options.items() if value is not None]
+            if ignored_options:
+                raise ValueError(f'{", ".join(ignored_options)} can not be combined with client, they are set on it')
+
+        self.client = client or self._create_client(hosts, http_client, serializer, deserializer, codec)
+        self.db = self.client.db(db_name, username=username, password=password)
+        self._indexed_collection_names = set()
+        self.graph = self._ensure_graph(graph_name)
+
+    @staticmethod
+    def _create_client(hosts: Union[str, List[str]] = None, http_client: HTTPClient = None,
+                       serializer: Callable[[Any], str] = None, deserializer: Callable[[str], Any] = None,
+                       codec: Union[str, Codec] = None) -> ArangoClient:
+        if codec:
+            codec = get_codec(codec)
+            serializer, deserializer = codec.serializer, codec.deserializer
+
+        return ArangoClient(hosts=hosts or 'http://127.0.0.1:8529', http_client=http_client,
+                            serializer=serializer or json.dumps, deserializer=deserializer or json.loads)
+
+    def with_collections(self, *collections: Type) -> 'DB':
+        for collection in self._get_collections(*collections):
+            if isinstance(collection, EdgeCollection):
                 self._ensure_edge_collection(collection)
             else:
                 self._ensure_collection(collection)
-
+                self._ensure_indexes(collection)
             self.collection_definition[collection.name] = collection
 
         return self
@@ -46,13 +156,16 @@ class DB:
 
     def _ensure_edge_collection(self, edge_collection: EdgeCollection) -> ArangoEdgeCollection:
         if not self.graph.has_edge_definition(edge_collection.name):
-            return self.graph.create_edge_definition(
+            cursor = self.graph.create_edge_definition(
                 edge_collection=edge_collection.name,
                 from_vertex_collections=[from_collection.name for from_collection in edge_collection.from_collections],
                 to_vertex_collections=[to_collection.name for to_collection in edge_collection.to_collections]
             )
+        else:
+            cursor = self.graph.edge_collection(edge_collection.name)
 
-        return self.graph.edge_collection(edge_collection.name)
+        self._ensure_indexes(edge_collection)
+        return cursor
 
     def _ensure_collection(self, collection: Collection) -> ArangoCollection:
         if not self.db.has_collection(collection.name):
@@ -60,17 +173,166 @@ class DB:
 
         return self.db[collection.name]
 
-    def _get_query_results(self, query: Query) -> Iterable:
-        query_stmt = query._to_stmt()
-        query_str, bind_vars = query_stmt.expand()
-        return map(query_stmt.result._load, self.db.aql.execute(query_str, bind_vars=bind_vars),
-                   itertools.repeat(self.collection_definition))
+    def _ensure_indexes(self, collection: Collection):
+        # edge collections are ensured on every write, so their indexes are only checked once per DB
+        if not collection.indexes or collection.name in self._indexed_collection_names:
+            return
+
+        cursor = self.db.collection(collection.name)
+        existing_indexes = cursor.indexes()
+
+        for index in collection.indexes:
+            if not any(index._matches(existing_index) for existing_index in existing_indexes):
+                options = {option: value for option, value in index.options.items() if value is not None}
+                getattr(cursor, f'add_{index.type}_index')(index.fields, **options)
+
+        self._indexed_collection_names.add(collection.name)
+
+    def _get_query_results(self, query: Union[Query, PreparedQuery], params: Dict[str, Any] = None,
+                           identity_map: MutableMapping[str, Document] = None) -> Iterable:
+        start = perf_counter()
+        compiled, bind_vars = self._compile(query, params=params)
+        return self._get_compiled_results(compiled, bind_vars, compile_time=perf_counter() - start,
+                                          identity_map=identity_map)
+
+    def _get_compiled_results(self, compiled: CompiledStmt, bind_vars: Dict[str, Any], compile_time: float = 0,
+                              identity_map: MutableMapping[str, Document] = None) -> Iterable:
+        if not self.hooks:
+            return map(compiled.get_loader(self.collection_definition, identity_map),
+                       self.db.aql.execute(compiled.query_str, bind_vars=bind_vars))
+
+        return self._iter_cursor(compiled, bind_vars, QueryProfile(compiled.query_str, bind_vars, compile_time),
+                                 identity_map=identity_map)
+
+    @staticmethod
+    def _first(results: Iterable) -> Any:
+        results = iter(results)
+
+        try:
+            return next(results, None)
+        finally:
+            if isinstance(results, Generator):
+                results.close()
+
+    def get(self, query: Union[Query, PreparedQuery], params: Dict[str, Any] = None) -> Any:
+        return self._first(self._get_query_results(query, params))
+
+    def get_many(self, query: Union[Query, PreparedQuery], params: Dict[str, Any] = None) -> List[Any]:
+        return list(self._get_query_results(query, params))
+
+    def explain(self, query: Union[Query, PreparedQuery], params: Dict[str, Any] = None) -> QueryPlan:
+        compiled, bind_vars = self._compile(query, params=params)
+        return self._explain(compiled.query_str, bind_vars)
 
-    def get(self, query: Query) -> Any:
-        return next(self._get_query_results(query), None)
+    def explain_set(self, from_: Union[Query, Document], edge_document: Union[Type, TEdge],
+                    to_: Union[Query, Document], data: Dict[str, Any] = None) -> QueryPlan:
+        return self._explain(*self._get_set_stmt(from_, edge_document, to_, data))
 
-    def get_many(self, query: Query) -> List[Any]:
-        return list(self._get_query_results(query))
+    def _explain(self, query_str: str, bind_vars: Dict[str, Any]) -> QueryPlan:
+        # python-arango's aql.explain does not take bind vars, which every compiled query has
+        request = Request(method='post', endpoint='/_api/explain', data={'query': query_str, 'bindVars': bind_vars})
+
+        def response_handler(response):
+            if not response.is_success:
+                raise AQLQueryExplainError(response, request)
+            return get_query_plan(query_str, response.body)
+
+        return self.db.aql._execute(request, response_handler)
+
+    def _get_connection_pool_size(self) -> int:
+        # more threads than pooled connections would only wait for a connection, or open ones which are thrown away
+        http_client = getattr(self.client, '_http', None)
+        if isinstance(http_client, PooledHTTPClient):
+            return http_client.max_connections_per_host
+
+        return DEFAULT_POOLSIZE
+
+    def get_parallel(self, queries: Iterable[Union[Query, PreparedQuery]], max_workers: int = None) -> List[Any]:
+        """
+        Runs the independent queries concurrently and returns the first result of each, in order, by default on as
+        many threads as the client pools connections per host.
+        """
+        return self._run_parallel(queries, self._first, max_workers)
+
+    def get_many_parallel(self, queries: Iterable[Union[Query, PreparedQuery]],
+                          max_workers: int = None) -> List[List[Any]]:
+        """Runs the independent queries concurrently, like get_parallel, and returns the results of each, in order."""
+        return self._run_parallel(queries, list, max_workers)
+
+    def _run_parallel(self, queries: Iterable[Union[Query, PreparedQuery]], collect: Callable[[Iterable], Any],
+                      max_workers: int = None) -> List[Any]:
+        compiled_queries = []
+        for query in queries:
+            start = perf_counter()
+            compiled_queries.append((*self._compile(query), perf_counter() - start))
+
+        if not compiled_queries:
+            return []
+
+        max_workers = max_workers or min(len(compiled_queries), self._get_connection_pool_size())
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(lambda compiled_query: collect(self._get_compiled_results(*compiled_query)),
+                                     compiled_queries))
+
+    def iter(self, query: Union[Query, PreparedQuery], params: Dict[str, Any] = None, batch_size: int = 1000,
+             stream: bool = True, ttl: int = None, prefetch: bool = False) -> Iterator[Any]:
+        """
+        Lazily yields the query results, fetching and hydrating them one batch of `batch_size` at a time.
+        With `prefetch`, the next batch is fetched in the background while the current one is consumed.
+        """
+        start = perf_counter()
+        compiled, bind_vars = self._compile(query, params=params)
+        query_profile = QueryProfile(compiled.query_str, bind_vars, perf_counter() - start) if self.hooks else None
+
+        return self._iter_cursor(compiled, bind_vars, query_profile, prefetch=prefetch, batch_size=batch_size,
+                                 stream=stream, ttl=ttl)
+
+    def _iter_cursor(self, compiled: CompiledStmt, bind_vars: Dict[str, Any], query_profile: QueryProfile = None,
+                     prefetch: bool = False, identity_map: MutableMapping[str, Document] = None,
+                     **options) -> Iterator[Any]:
+        if query_profile:
+            options['profile'] = self.profile
+
+        start = perf_counter()
+        cursor = self.db.aql.execute(compiled.query_str, bind_vars=bind_vars, **options)
+        execute_time = perf_counter() - start
+        hydrate_time = 0
+        row_count = 0
+        load = compiled.get_loader(self.collection_definition, identity_map)
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+
+        try:
+            while True:
+                batch = list(cursor.batch())
+                cursor.batch().clear()
+                next_batch = executor.submit(cursor.fetch) if executor and cursor.has_more() else None
+
+                for data in batch:
+                    start = perf_counter()
+                    result = load(data)
+                    hydrate_time += perf_counter() - start
+                    row_count += 1
+                    yield result
+
+                start = perf_counter()
+                if next_batch:
+                    next_batch.result()
+                elif cursor.has_more():
+                    cursor.fetch()
+                else:
+                    break
+                execute_time += perf_counter() - start
+        finally:
+            if executor:
+                executor.shutdown(wait=True)
+            if cursor.has_more():
+                cursor.close(ignore_missing=True)
+            if query_profile:
+                query_profile.execute_time, query_profile.hydrate_time = execute_time, hydrate_time
+                query_profile.row_count = row_count
+                query_profile.stats, query_profile.profile = cursor.statistics(), cursor.profile()
+                for hook in self.hooks:
+                    hook(query_profile)
 
     def add(self, document: TDocument) -> TDocument:
         cursor = self._ensure_collection(document._get_collection())
@@ -78,6 +340,47 @@ class DB:
         document._set_meta(**result)
         return document
 
+    def add_many(self, documents: Iterable[TDocument], chunk_size: int = 1000) -> List[TDocument]:
+        """
+        Inserts the documents with one bulk request per collection and chunk of `chunk_size` documents.
+        Every chunk is sent even if some documents fail; inserted documents have their meta set, and a
+        BulkInsertError listing the failed documents is raised at the end.
+        """
+        documents = list(documents)
+        collection_name_to_documents = {}
+        collection_name_to_collection = {}
+        failures = []
+
+        for document in documents:
+            collection = document._get_collection()
+            collection_name_to_documents.setdefault(collection.name, []).append(document)
+            collection_name_to_collection[collection.name] = collection
+
+        for collection_name, collection_documents in collection_name_to_documents.items():
+            cursor = self._ensure_bulk_collection(collection_name_to_collection[collection_name])
+
+            for chunk in chunks(collection_documents, chunk_size):
+                results = cursor.insert_many([document._dump() for document in chunk])
+
+                for document, result in zip(chunk, results):
+                    if isinstance(result, Exception):
+                        failures.append((document, result))
+                        continue
+
+                    document._set_meta(_id=result['_id'], _key=result['_key'], _rev=result['_rev'])
+
+        if failures:
+            raise BulkInsertError(failures)
+
+        return documents
+
+    def _ensure_bulk_collection(self, collection: Collection) -> ArangoCollection:
+        if isinstance(collection, EdgeCollection):
+            self._ensure_edge_collection(collection)
+            return self.db.collection(collection.name)
+
+        return self._ensure_collection(collection)
+
     def update(self, document: TDocument) -> TDocument:
         cursor = self._ensure_collection(document._get_collection())
         result = cursor.update(document._dump())
@@ -85,41 +388,121 @@ class DB:
         document._set_meta(**result)
         return document
 
+    def update_many(self, documents: Iterable[TDocument], chunk_size: int = 1000,
+                    changes: List[Dict[str, Any]] = None) -> List[Union[str, Exception]]:
+        """
+        Updates the documents with one bulk request per collection and chunk of `chunk_size` documents.
+        `changes` holds, in order, the attributes to send for each document instead of its whole dump.
+        Returns, in order, the new `_rev` of every updated document or the error it failed with.
+        """
+        documents = list(documents)
+        results = [None] * len(documents)
+        collection_name_to_indexes = {}
+        collection_name_to_collection = {}
+
+        for index, document in enumerate(documents):
+            collection = document._get_collection()
+            collection_name_to_indexes.setdefault(collection.name, []).append(index)
+            collection_name_to_collection[collection.name] = collection
+
+        for collection_name, indexes in collection_name_to_indexes.items():
+            cursor = self._ensure_bulk_collection(collection_name_to_collection[collection_name])
+
+            for chunk in chunks(indexes, chunk_size):
+                chunk_results = cursor.update_many([
+                    documents[index]._dump() if changes is None else
+                    {**changes[index], '_id': documents[index]._id, '_key': documents[index]._key} for index in chunk])
+
+                for index, result in zip(chunk, chunk_results):
+                    if isinstance(result, Exception):
+                        results[index] = result
+                        continue
+
+                    documents[index]._set_meta(_id=result['_id'], _key=result['_key'], _rev=result['_rev'])
+                    results[index] = result['_rev']
+
+        return results
+
     def set(self, from_: Union[Query, Document], edge_document: Union[Type, TEdge], to_: Union[Query, Document],
             data: Dict[str, Any] = None):
         if isinstance(from_, Document) and isinstance(to_, Document):
             return self._set_from_objects(from_, to_, edge_document, data)
 
         self._ensure_edge_collection(edge_document._get_collection())
-        bind_vars = {}
-
-        from_stmt = from_._to_stmt(prefix='from_p') if isinstance(from_, Query) else Stmt(f'[{{_id: @from_id}}]',
-                                                                                          bind_vars={
-                                                                                              'from_id': from_._id})
-        from_str, from_bind_vars = from_stmt.expand()
-        bind_vars.update(from_bind_vars)
-        to_stmt = to_._to_stmt(prefix='to_p') if isinstance(to_, Query) else Stmt(f'[{{_id: @to_id}}]',
-                                                                                  bind_vars={'to_id': to_._id})
-        to_str, to_bind_vars = to_stmt.expand()
-        bind_vars.update(to_bind_vars)
+        statement, bind_vars = self._get_set_stmt(from_, edge_document, to_, data)
+        self.db.aql.execute(statement, bind_vars=bind_vars)
 
-        if isclass(edge_document):
-            dict_doc = Document._dump_from_dict(data, Document.INIT_PROPERTIES)
-        else:
-            dict_doc = edge_document._dump()
+    def set_many(self, edge_document: Type, pairs: Iterable[Tuple], data: Dict[str, Any] = None,
+                 chunk_size: int = 1000, skip_existing: bool = False) -> int:
+        """
+        Inserts an edge of type `edge_document` for every `(from_, to_)` or `(from_, to_, edge)` pair, where `from_`
+        and `to_` are documents or document ids, with one AQL statement per chunk of `chunk_size` edges.
+        Pairs without an edge object get `data` as the edge's attributes, pairs with a dict instead of an edge object
+        get the dict's attributes. With `skip_existing`, pairs which are already connected by an edge of this type,
+        or repeated in the pairs, are skipped. Returns the number of inserted edges.
+        """
+        edge_collection = edge_document._get_collection()
+        self._ensure_edge_collection(edge_collection)
+        dict_data = Document._dump_from_dict(dict(data), Document.INIT_PROPERTIES) if data else {}
 
-        for key, value in dict_doc.items():
-            bind_vars[f'edge_{key}'] = value
+        skip_existing_stmt = f'''
+            FILTER LENGTH(
+                FOR existing IN {edge_collection.name}
+                    FILTER existing._from == edge._from AND existing._to == edge._to
+                    LIMIT 1
+                    RETURN 1
+            ) == 0''' if skip_existing else ''
 
         statement = f'''
-        LET from_entities = ({from_str})
-        LET to_entities = ({to_str})
-        FOR from_entity IN from_entities
-            FOR to_entity IN to_entities
-                insert {{_from: from_entity._id, _to: to_entity._id{',' if len(dict_doc) > 0 else ''} {', '.join([f'{key}: @edge_{key}' for key in dict_doc.keys()])}}} INTO {edge_document._get_collection().name}
+        FOR index IN 0..LENGTH(@edges) - 1
+            LET edge = @edges[index]
+            {skip_existing_stmt}
+            INSERT edge INTO {edge_collection.name}
+            RETURN {{index: index, _id: NEW._id, _key: NEW._key, _rev: NEW._rev}}
         '''
 
-        self.db.aql.execute(statement, bind_vars=bind_vars)
+        inserted = 0
+
+        for chunk in chunks(pairs, chunk_size):
+            edges = []
+            edge_pairs = []
+            ids = set()
+
+            for from_, to_, *edge in chunk:
+                from_id = self._get_document_id(from_)
+                to_id = self._get_document_id(to_)
+
+                # the existing edges are looked up before the chunk is inserted, so duplicates in it would pass
+                if skip_existing and (from_id, to_id) in ids:
+                    continue
+                ids.add((from_id, to_id))
+                edge_pairs.append((from_, to_, *edge))
+
+                if edge and isinstance(edge[0], dict):
+                    edges.append({**Document._dump_from_dict(dict(edge[0]), Document.INIT_PROPERTIES),
+                                  '_from': from_id, '_to': to_id})
+                elif edge and edge[0] is not None:
+                    edge[0]._from = from_id
+                    edge[0]._to = to_id
+                    edges.append(edge[0]._dump())
+                else:
+                    edges.append({'_from': from_id, '_to': to_id, **dict_data})
+
+            for result in self.db.aql.execute(statement, bind_vars={'edges': edges}):
+                _, _, *edge = edge_pairs[result['index']]
+                if edge and isinstance(edge[0], Document):
+                    edge[0]._set_meta(_id=result['_id'], _key=result['_key'], _rev=result['_rev'])
+                inserted += 1
+
+        return inserted
+
+    @staticmethod
+    def _get_document_id(document: Union[str, Document]) -> str:
+        document_id = document if isinstance(document, str) else document._id
+        if not document_id:
+            raise ValueError(f'{document} has no _id, add it before setting edges to it')
+
+        return document_id
 
     def _set_from_objects(self, from_, to_, edge_document, data):
         cursor = self._ensure_edge_collection(edge_document._get_collection())
@@ -1,14 +1,41 @@
 from abc import abstractmethod, ABC
-from datetime import datetime
-from typing import List, TypeVar, Any, Dict, Collection
+from dataclasses import fields, MISSING
+from datetime import datetime, date
+from typing import List, TypeVar, Any, Dict, Collection, Callable, Union, MutableMapping, get_type_hints, get_origin, \
+    get_args
 
 from _query import DocumentQuery
-from _result import Result
+from _result import Result, get_identity_loader
 
 T = TypeVar('T', bound='Collection')
 
+UNCONVERTED_TYPES = (str, int, float, bool)
+
+
+def dump_datetime(value):
+    return None if value is None else str(value)
+
+
+def dump_value(value):
+    return str(value) if isinstance(value, datetime) else value
+
+
+def get_converter(annotation) -> Union[Callable[[Any], Any], None]:
+    if get_origin(annotation) is Union:
+        annotations = [a for a in get_args(annotation) if a is not type(None)]
+        annotation = annotations[0] if len(annotations) == 1 else Any
+
+    if annotation in UNCONVERTED_TYPES:
+        return None
+
+    if isinstance(annotation, type) and issubclass(annotation, date):
+        return dump_datetime
+
+    return dump_value
+
 
 class Document(ABC, Result):
+    __slots__ = ()
     INIT_PROPERTIES = ['_key', '_id', '_rev']
 
     def __init__(self, _key=None, _rev=None, _id=None):
@@ -18,10 +45,110 @@ class Document(ABC, Result):
 
     @classmethod
     def _load(cls, d: Any, _: Dict[str, Collection]) -> T:
-        return cls(**d)
+        return cls._get_loader(_)(d)
+
+    @classmethod
+    def _get_loader(cls, _: Dict[str, Collection],
+                    identity_map: MutableMapping[str, Any] = None) -> Callable[[Dict[str, Any]], T]:
+        loader = cls.__dict__.get('_loader')
+        if loader is None:
+            loader = cls._loader = cls._build_loader()
+
+        return get_identity_loader(loader, identity_map)
+
+    @classmethod
+    def _build_loader(cls) -> Callable[[Dict[str, Any]], T]:
+        # dataclass documents are hydrated without their __init__, setting the fields directly and ignoring
+        # attributes they don't declare; documents with their own __init__ or init-only variables go through it
+        if '__dataclass_fields__' not in cls.__dict__ or len(fields(cls)) != len(cls.__dataclass_fields__):
+            return lambda d: cls(**d)
+
+        meta_names = tuple(cls.INIT_PROPERTIES)
+        field_defaults = tuple((f.name, cls._get_default_factory(f)) for f in fields(cls))
+        post_init = getattr(cls, '__post_init__', None)
+        has_dict = '__slots__' not in cls.__dict__
+        new = object.__new__
+
+        def load(d: Dict[str, Any]) -> T:
+            document = new(cls)
+            values = {name: d.get(name) for name in meta_names}
+
+            for name, default_factory in field_defaults:
+                values[name] = d[name] if name in d else default_factory()
+
+            if has_dict:
+                document.__dict__.update(values)
+            else:
+                for name, value in values.items():
+                    object.__setattr__(document, name, value)
+
+            if post_init:
+                post_init(document)
+
+            return document
+
+        return load
+
+    @classmethod
+    def _get_default_factory(cls, field) -> Callable[[], Any]:
+        if field.default is not MISSING:
+            return lambda: field.default
+
+        if field.default_factory is not MISSING:
+            return field.default_factory
+
+        def missing():
+            raise TypeError(f'{cls.__name__} is missing the {field.name} field')
+
+        return missing
 
     def _dump(self) -> dict:
-        return self._dump_from_dict(vars(self), self.INIT_PROPERTIES)
+        return self._get_dumper()(self)
+
+    @classmethod
+    def _get_dumper(cls) -> Callable[['Document'], dict]:
+        dumper = cls.__dict__.get('_dumper')
+        if dumper is None:
+            dumper = cls._dumper = cls._build_dumper()
+
+        return dumper
+
+    @classmethod
+    def _build_dumper(cls) -> Callable[['Document'], dict]:
+        # dataclass documents are dumped field by field with converters picked from the annotations, other documents
+        # through a copy of their attributes. is_dataclass would also hold for those, as Result is a dataclass
+        if '__dataclass_fields__' not in cls.__dict__:
+            return lambda document: document._dump_from_dict(dict(document._get_vars()), cls.INIT_PROPERTIES)
+
+        try:
+            type_hints = get_type_hints(cls)
+        except Exception:
+            type_hints = {}
+
+        meta_names = tuple(cls.INIT_PROPERTIES)
+        field_converters = tuple((f.name, get_converter(type_hints.get(f.name, f.type))) for f in fields(cls))
+
+        def dump(document) -> dict:
+            result = {}
+
+            for name in meta_names:
+                value = getattr(document, name, None)
+                if value:
+                    result[name] = value
+
+            for name, converter in field_converters:
+                value = getattr(document, name)
+                result[name] = converter(value) if converter else value
+
+            return result
+
+        return dump
+
+    def _get_vars(self) -> dict:
+        if hasattr(self, '__dict__'):
+            return vars(self)
+
+        return {name: getattr(self, name) for name in self.__slots__ if name != '__weakref__' and hasattr(self, name)}
 
     @staticmethod
     def _dump_from_dict(result, keys: List[str]):
@@ -48,12 +175,10 @@ class Document(ABC, Result):
 
 
 class Edge(Document):
+    __slots__ = ()
     INIT_PROPERTIES = ['_key', '_id', '_rev', '_from', '_to']
 
     def __init__(self, _key=None, _rev=None, _id=None, _from=None, _to=None):
         super().__init__(_key, _rev, _id)
         self._from = _from
         self._to = _to
-
-    def _dump(self) -> dict:
-        return self._dump_from_dict(vars(self), keys=self.INIT_PROPERTIES)
@@ -0,0 +1,56 @@
+import requests
+from arango.http import HTTPClient
+from arango.response import Response
+from requests.adapters import HTTPAdapter
+
+
+class PooledHTTPClient(HTTPClient):
+    """
+    HTTP client for ArangoClient with configurable connection pooling.
+
+    `host_pools` is the number of per-host pools kept, `max_connections_per_host` the number of connections kept
+    alive in each of them. With `block`, requests wait for a free pooled connection instead of opening a
+    throwaway one when the pool is exhausted. `timeout` is the request timeout in seconds, or a
+    (connect, read) tuple.
+    """
+
+    def __init__(self, host_pools: int = 10, max_connections_per_host: int = 10, keep_alive: bool = True,
+                 timeout=None, block: bool = True, max_retries: int = 0):
+        self.host_pools = host_pools
+        self.max_connections_per_host = max_connections_per_host
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.block = block
+        self.max_retries = max_retries
+
+    def create_session(self, host: str) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.host_pools, pool_maxsize=self.max_connections_per_host,
+                              max_retries=self.max_retries, pool_block=self.block)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+
+        return session
+
+    def send_request(self, session: requests.Session, method: str, url: str, params=None, data=None, headers=None,
+                     auth=None) -> Response:
+        response = session.request(
+            method=method,
+            url=url,
+            params=params,
+            data=data,
+            headers=headers,
+            auth=auth,
+            timeout=self.timeout
+        )
+        return Response(
+            method=response.request.method,
+            url=response.url,
+            headers=response.headers,
+            status_code=response.status_code,
+            status_text=response.reason,
+            raw_body=response.text,
+        )
@@ -0,0 +1,140 @@
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Set
+
+LOOP_NODE_TYPES = {'EnumerateCollectionNode', 'EnumerateListNode', 'IndexNode', 'TraversalNode', 'ShortestPathNode',
+                   'KShortestPathsNode', 'EnumerateViewNode'}
+OUT_VARIABLE_KEYS = ('outVariable', 'vertexOutVariable', 'edgeOutVariable', 'pathOutVariable')
+
+
+@dataclass
+class PlanIndex:
+    collection: str
+    type: str
+    fields: List[str]
+
+
+@dataclass
+class CrossProduct:
+    outer: str
+    inner: str
+
+
+@dataclass
+class QueryPlan:
+    """
+    Summary of the server's execution plan for a query. `cross_products` are loops nested in another loop without
+    depending on it, `correlated_subqueries` are subqueries run once per row of an enclosing loop.
+    """
+    query_str: str
+    estimated_cost: float = 0
+    estimated_items: int = 0
+    indexes: List[PlanIndex] = field(default_factory=list)
+    full_scans: List[str] = field(default_factory=list)
+    cross_products: List[CrossProduct] = field(default_factory=list)
+    correlated_subqueries: List[str] = field(default_factory=list)
+    rules: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+
+
+@dataclass
+class _Scope:
+    loops: List[Dict[str, Any]] = field(default_factory=list)
+    dependencies: Set[int] = field(default_factory=set)
+    per_row: bool = False
+
+
+def _get_referenced_variables(value: Any) -> Set[int]:
+    if isinstance(value, list):
+        return set().union(*map(_get_referenced_variables, value))
+
+    if not isinstance(value, dict):
+        return set()
+
+    if value.get('type') == 'reference':
+        return {value['id']}
+
+    variable_ids = set()
+    for key, item in value.items():
+        if key in ('inVariable', 'inVariables', 'inVertex') and isinstance(item, (dict, list)):
+            variable_ids.update(v['id'] for v in (item if isinstance(item, list) else [item]) if 'id' in v)
+        elif key in ('expression', 'condition', 'subNodes', 'filter'):
+            variable_ids.update(_get_referenced_variables(item))
+
+    return variable_ids
+
+
+def _get_loop_name(node: Dict[str, Any]) -> str:
+    for key in OUT_VARIABLE_KEYS:
+        if node.get(key):
+            return node[key]['name']
+
+    return node['type']
+
+
+def _get_node_indexes(node: Dict[str, Any]) -> List[PlanIndex]:
+    indexes = node.get('indexes') or []
+    if isinstance(indexes, dict):
+        indexes = indexes.get('base', []) + [index for level in indexes.get('levels', {}).values() for index in level]
+
+    return [PlanIndex(collection=node.get('collection') or str(index.get('id', '')).partition('/')[0],
+                      type=index.get('type', ''), fields=list(index.get('fields', []))) for index in indexes]
+
+
+def _walk_nodes(nodes: List[Dict[str, Any]], scopes: List[_Scope], variable_dependencies: Dict[int, Set[int]],
+                query_plan: QueryPlan):
+    for node in nodes:
+        scope = scopes[-1]
+        node_type = node['type']
+        dependencies = set().union(*[variable_dependencies.get(v, set()) for v in _get_referenced_variables(node)])
+        scope.dependencies.update(dependencies)
+
+        if node_type in ('SubqueryStartNode', 'SubqueryNode'):
+            scopes.append(_Scope(per_row=any(s.loops for s in scopes)))
+
+            if node_type == 'SubqueryStartNode':
+                continue
+
+            _walk_nodes(node['subquery']['nodes'], scopes, variable_dependencies, query_plan)
+            node_type = 'SubqueryEndNode'
+
+        if node_type == 'SubqueryEndNode':
+            subquery_scope = scopes.pop()
+            scopes[-1].dependencies.update(subquery_scope.dependencies)
+            if node.get('outVariable'):
+                variable_dependencies[node['outVariable']['id']] = subquery_scope.dependencies
+                if subquery_scope.per_row:
+                    query_plan.correlated_subqueries.append(node['outVariable']['name'])
+            continue
+
+        if node_type in LOOP_NODE_TYPES:
+            query_plan.indexes.extend(_get_node_indexes(node))
+
+            if node_type == 'EnumerateCollectionNode':
+                query_plan.full_scans.append(node['collection'])
+
+            open_loop_ids = {loop['id'] for loop in scope.loops}
+            if scope.loops and (node_type == 'EnumerateCollectionNode' or not dependencies & open_loop_ids):
+                query_plan.cross_products.append(CrossProduct(outer=_get_loop_name(scope.loops[-1]),
+                                                              inner=_get_loop_name(node)))
+
+            scope.loops.append(node)
+            dependencies = dependencies | {node['id']}
+
+        for key in OUT_VARIABLE_KEYS:
+            if node.get(key):
+                variable_dependencies[node[key]['id']] = dependencies
+
+
+def get_query_plan(query_str: str, explain_result: Dict[str, Any]) -> QueryPlan:
+    plan = explain_result['plan']
+    query_plan = QueryPlan(query_str=query_str, estimated_cost=plan.get('estimatedCost', 0),
+                           estimated_items=plan.get('estimatedNrItems', 0), rules=list(plan.get('rules', [])))
+
+    _walk_nodes(plan.get('nodes', []), [_Scope()], {}, query_plan)
+
+    query_plan.warnings += [warning['message'] for warning in explain_result.get('warnings', [])]
+    query_plan.warnings += [f'full collection scan of {collection}' for collection in query_plan.full_scans]
+    query_plan.warnings += [f'cross product of {p.outer} and {p.inner}' for p in query_plan.cross_products]
+    query_plan.warnings += [f'subquery {name} runs once per row' for name in query_plan.correlated_subqueries]
+
+    return query_plan
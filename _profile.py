@@ -0,0 +1,29 @@
+from dataclasses import dataclass, field
+from typing import Dict, Any, List
+
+
+@dataclass
+class QueryProfile:
+    """
+    Timings of a single query, in seconds. `execute_time` includes fetching the following batches; `stats` and
+    `profile` hold the server's statistics and, when the DB profiles queries, its per-phase profile.
+    """
+    query_str: str
+    bind_vars: Dict[str, Any]
+    compile_time: float = 0
+    execute_time: float = 0
+    hydrate_time: float = 0
+    row_count: int = 0
+    stats: Dict[str, Any] = None
+    profile: Dict[str, Any] = None
+
+
+@dataclass
+class QueryProfiler:
+    profiles: List[QueryProfile] = field(default_factory=list)
+
+    def __call__(self, query_profile: QueryProfile):
+        self.profiles.append(query_profile)
+
+    def clear(self):
+        self.profiles.clear()
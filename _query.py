@@ -1,7 +1,7 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field as dataclass_field
 from inspect import isclass
-from typing import Any, List, Type, Dict, Tuple, TypeVar, Union
+from typing import Any, List, Type, Dict, Tuple, TypeVar, Union, Iterable
 
 from _collection import Collection, EdgeCollection
 from _result import ListResult, DictResult, AnyResult, Result, VALUE_RESULT, DOCUMENT_RESULT
@@ -54,6 +54,11 @@ class Aliased:
 @dataclass
 class Query(ABC, Returns, Aliased):
     matchers: List[Filter] = dataclass_field(default_factory=list, init=False)
+    limit_count: 'BoundValue' = dataclass_field(default=None, init=False)
+    limit_offset: 'BoundValue' = dataclass_field(default=None, init=False)
+    sort_fields: List[str] = dataclass_field(default_factory=list, init=False)
+    distinct: bool = dataclass_field(default=False, init=False)
+    dedup_fields: List[str] = dataclass_field(default_factory=list, init=False)
 
     @abstractmethod
     def _to_stmt(self, prefix: str = 'p', alias_to_result: Dict[str, Result] = None) -> Stmt:
@@ -67,17 +72,27 @@ class Query(ABC, Returns, Aliased):
 
         return self
 
-    def limit(self, limit) -> Q:
-        # TODO
-        raise ValueError
+    def limit(self, limit: Union[int, 'Param'], offset: Union[int, 'Param'] = 0) -> Q:
+        # both are bind vars, so every page of a query shares its compiled statement and server plan
+        for value in (limit, offset):
+            if not isinstance(value, Param) and (not isinstance(value, int) or value < 0):
+                raise ValueError(f'limit and offset must be non-negative integers, got {limit!r} and {offset!r}')
 
-    def sort(self, fields: List[str]) -> Q:
-        # TODO
-        raise ValueError
+        self.limit_count = BoundValue(limit)
+        self.limit_offset = BoundValue(offset)
+        return self
 
-    def dedup(self, fields: List[str]) -> Q:
-        # TODO
-        raise ValueError
+    def sort(self, *fields: str) -> Q:
+        # fields prefixed with '-' are sorted in descending order. SORT is emitted right before LIMIT, so the server
+        # can serve both from a persistent index whose leading attributes are the sorted fields, in the same direction
+        self.sort_fields += fields
+        return self
+
+    def dedup(self, *fields: str) -> Q:
+        # without fields, duplicates of the whole returned value are removed
+        self.distinct = True
+        self.dedup_fields += fields
+        return self
 
     def group(self, *fields: Union[str, 'Field', Type['Document'], Type[object], 'Var'],
               **field_to_display_to_field: Union[str, 'Grouped', Type['Document'], Type[object], 'Var']) -> 'Group':
@@ -139,8 +154,98 @@ class Query(ABC, Returns, Aliased):
 
         return Select(query=self, display_field_to_grouped=display_field_to_grouped)
 
+    def _get_sort_attribute(self, relative_to: str, field: str) -> str:
+        return f'{relative_to}.{field}'
+
+    def _get_sort_stmt(self, relative_to: str) -> str:
+        if not self.sort_fields:
+            return ''
+
+        return 'SORT ' + ', '.join(
+            f'{self._get_sort_attribute(relative_to, field[1:])} DESC' if field.startswith('-') else
+            f'{self._get_sort_attribute(relative_to, field)} ASC' for field in self.sort_fields)
+
+    def _get_limit_stmt(self, prefix: str, bind_vars: Dict[str, Any]) -> str:
+        if self.limit_count is None:
+            return ''
+
+        bind_vars[f'{prefix}_offset'] = self.limit_offset.compare_value
+        bind_vars[f'{prefix}_count'] = self.limit_count.compare_value
+        return f'LIMIT @{prefix}_offset, @{prefix}_count'
+
+    def _get_dedup_returns(self, relative_to: str, returns: str, prefix: str) -> Tuple[str, str]:
+        # the variables holding the step's document and returned value once its dedup COLLECT ran
+        if not self.distinct:
+            return relative_to, returns
+
+        if self.dedup_fields:
+            return f'{prefix}_dedup_docs[0]', f'{prefix}_dedup_docs[0]' + self.attribute_return
+
+        return f'{prefix}_distinct', f'{prefix}_distinct'
+
+    def _get_distinct_keyword(self) -> str:
+        # for queries returning computed documents, only whole returned values can be deduplicated
+        if self.dedup_fields:
+            raise ValueError(f'{type(self).__name__} can only be deduplicated on its whole returned value')
+
+        return 'DISTINCT ' if self.distinct else ''
+
+    def _get_rows_tail_stmts(self, row: str, relative_to: str, prefix: str, bind_vars: Dict[str, Any]) -> str:
+        # for queries returning computed rows. deduplicated rows are collected before they are sorted and limited, so
+        # that the limit counts distinct rows, and each is sorted by the first of its duplicates in the sort order
+        distinct_keyword = self._get_distinct_keyword()
+        if not distinct_keyword or not self.sort_fields and self.limit_count is None:
+            tail_stmts = [self._get_sort_stmt(relative_to), self._get_limit_stmt(prefix, bind_vars),
+                          f'RETURN {distinct_keyword}{row}']
+            return DELIMITER.join(stmt for stmt in tail_stmts if stmt)
+
+        aggregates, sort_keys = [], []
+        for index, field in enumerate(self.sort_fields):
+            descending = field.startswith('-')
+            sort_attribute = self._get_sort_attribute(relative_to, field[1:] if descending else field)
+            aggregates.append(f'{prefix}_sort_{index} = {"MAX" if descending else "MIN"}({sort_attribute})')
+            sort_keys.append(f'{prefix}_sort_{index} {"DESC" if descending else "ASC"}')
+
+        aggregate_stmt = f' AGGREGATE {", ".join(aggregates)}' if aggregates else ''
+        tail_stmts = [f'''COLLECT {prefix}_row = {row}{aggregate_stmt} OPTIONS {{method: 'hash'}}''',
+                      f'SORT {", ".join(sort_keys)}' if sort_keys else '', self._get_limit_stmt(prefix, bind_vars),
+                      f'RETURN {prefix}_row']
+        return DELIMITER.join(stmt for stmt in tail_stmts if stmt)
+
+    def _get_scope_aliases(self) -> List[str]:
+        # the aliases set by earlier steps of the same loop, a COLLECT drops them
+        return []
+
+    def _get_dedup_stmt(self, relative_to: str, returns: str, prefix: str) -> str:
+        if not self.distinct:
+            return ''
+
+        # the COLLECT deduplicates the whole result of the step, across the rows of the outer loops, and only keeps its
+        # own variables, so the earlier aliases can not be used after it
+        scope_aliases = self._get_scope_aliases()
+        if scope_aliases:
+            raise ValueError(f'{type(self).__name__} can not be deduplicated after the variables '
+                             f'{", ".join(scope_aliases)}, set them after the dedup instead')
+
+        if self.dedup_fields:
+            dedup_keys = ', '.join(f'{relative_to}.{field}' for field in self.dedup_fields)
+            return f'''COLLECT {prefix}_dedup = [{dedup_keys}] INTO {prefix}_dedup_docs = {relative_to} OPTIONS {{method: 'hash'}}'''
+
+        return f'''COLLECT {prefix}_distinct = {returns} OPTIONS {{method: 'hash'}}'''
+
+    def _get_tail_stmts(self, relative_to: str, returns: str, prefix: str, bind_vars: Dict[str, Any]) -> str:
+        dedup_relative_to, _ = self._get_dedup_returns(relative_to, returns, prefix)
+        tail_stmts = [self._get_dedup_stmt(relative_to, returns, prefix), self._get_sort_stmt(dedup_relative_to),
+                      self._get_limit_stmt(prefix, bind_vars)]
+
+        return DELIMITER.join(stmt for stmt in tail_stmts if stmt)
+
+    def _get_alias_stmts(self, returns: str) -> str:
+        return DELIMITER.join(f'''LET {alias} = {returns}''' for alias in self.aliases)
+
     def _get_step_stmts(self, relative_to: str, prefix: str, returns: str, bind_vars: Dict[str, Any] = None,
-                        bind_vars_index: int = 0) -> Tuple[str, Dict[str, Any], int]:
+                        bind_vars_index: int = 0, with_tail_stmts: bool = True) -> Tuple[str, Dict[str, Any], int]:
+        # without tail stmts, the caller emits the dedup, sort, limit and aliases of the step itself
         step_stmts = []
 
         if not bind_vars:
@@ -153,6 +258,14 @@ class Query(ABC, Returns, Aliased):
             bind_vars.update(matcher_vars)
             bind_vars_index += len(matcher_vars)
 
+        if not with_tail_stmts:
+            return DELIMITER.join(step_stmts), bind_vars, bind_vars_index
+
+        tail_stmts = self._get_tail_stmts(relative_to, returns, prefix, bind_vars)
+        if tail_stmts:
+            step_stmts.append(tail_stmts)
+
+        _, returns = self._get_dedup_returns(relative_to, returns, prefix)
         for alias in self.aliases:
             step_stmts.append(f'''LET {alias} = {returns}''')
 
@@ -172,6 +285,10 @@ class Grouped(ABC):
     def _to_group_stmt(self, prefix: str, collected, alias_to_result: Dict[str, Result]) -> Stmt:
         pass
 
+    def _get_referenced_fields(self) -> Union[List[str], None]:
+        # the top level attributes of the collected documents needed by the group stmt, None if they are needed whole
+        return None
+
 
 @dataclass
 class Selected(ABC):
@@ -198,6 +315,9 @@ class Aggregated(Grouped, Selected, Aliased):
         alias_to_result.update(stmt.alias_to_result)
         return Stmt(f'''{self.func}({query_str})''', bind_vars, result=VALUE_RESULT, alias_to_result=alias_to_result)
 
+    def _get_referenced_fields(self) -> Union[List[str], None]:
+        return self.group._get_referenced_fields() if isinstance(self.group, Grouped) else None
+
     def __str__(self) -> str:
         return f'{self.func.lower()}_{self.group}'
 
@@ -227,6 +347,20 @@ class Field(Grouped, Selected, Aliased):
         return Stmt(f'''{relative_to}.{self.field}''', {}, result=VALUE_RESULT, alias_to_result=alias_to_result,
                     aliases=self.aliases)
 
+    def _as_used_in_by(self) -> 'Field':
+        field = Field(field=self.field, used_in_by=True)
+        field.aliases = self.aliases
+        return field
+
+    def _get_referenced_fields(self) -> Union[List[str], None]:
+        if not isinstance(self.field, str):
+            return None
+
+        if self.used_in_by:
+            return []
+
+        return [self.field.split('.')[0].split('[')[0]]
+
     def __str__(self) -> str:
         return str(self.field)
 
@@ -246,13 +380,45 @@ class Group(Query):
 
         return self
 
+    def _get_by_fields(self) -> List[Union[str, 'Var']]:
+        return self.by_fields or ['_key']
+
+    def _get_grouped(self) -> Dict[str, Grouped]:
+        # fields grouped by are read from their COLLECT variables; they are marked on copies, so that compiling
+        # leaves the query, and with it its statement cache key, unchanged
+        by_fields = self._get_by_fields()
+        return {display_field: grouped._as_used_in_by() if isinstance(grouped, Field) and grouped.field in by_fields
+                else grouped for display_field, grouped in self.display_field_to_grouped.items()}
+
+    def _get_sort_attribute(self, relative_to: str, field: str) -> str:
+        for by_field in self._get_by_fields():
+            if by_field == field or isinstance(by_field, Var) and by_field._name == field:
+                return f'field_{field}'
+
+        raise ValueError(f'a group can only be sorted by the fields it is grouped by, not by {field}')
+
+    def _get_into_stmt(self, display_field_to_grouped: Dict[str, Grouped], previous_result: str, prefix: str,
+                       bind_vars: Dict[str, Any]) -> str:
+        # only the attributes the grouped fields read are collected into the groups
+        referenced_fields = set()
+
+        for group_field in display_field_to_grouped.values():
+            fields = group_field._get_referenced_fields()
+            if fields is None:
+                return f' INTO groups = {previous_result}'
+
+            referenced_fields.update(fields)
+
+        if not referenced_fields:
+            return ''
+
+        bind_vars[f'{prefix}_keep'] = sorted(referenced_fields)
+        return f' INTO groups = KEEP({previous_result}, @{prefix}_keep)'
+
     def _to_stmt(self, prefix: str = 'p', alias_to_result: Dict[str, Result] = None) -> Stmt:
         if not alias_to_result:
             alias_to_result = {}
 
-        if len(self.by_fields) == 0:
-            self.by_fields = ['_key']
-
         stmt = self.query._to_stmt(f'{prefix}_0', alias_to_result)
 
         alias_to_result.update(stmt.alias_to_result)
@@ -261,7 +427,7 @@ class Group(Query):
 
         by_fields_stmt = []
 
-        for by_field in self.by_fields:
+        for by_field in self._get_by_fields():
             if isinstance(by_field, str):
                 by_fields_stmt.append(f'field_{by_field} = {previous_result}.{by_field}')
             elif isinstance(by_field, Var):
@@ -272,13 +438,11 @@ class Group(Query):
         bind_vars_index = 1
         groups_stmt = []
 
-        result = {}
-        for display_field, group_field in self.display_field_to_grouped.items():
-            print(display_field, group_field)
-
-            if isinstance(group_field, Field) and group_field.field in self.by_fields:
-                group_field.used_in_by = True
+        display_field_to_grouped = self._get_grouped()
+        into_stmt = self._get_into_stmt(display_field_to_grouped, previous_result, prefix, bind_vars)
 
+        result = {}
+        for display_field, group_field in display_field_to_grouped.items():
             group_stmt = group_field._to_group_stmt(prefix=f'{prefix}_{bind_vars_index}', collected='groups',
                                                     alias_to_result=alias_to_result)
             alias_to_result.update(alias_to_result)
@@ -291,12 +455,13 @@ class Group(Query):
             bind_vars.update(b_vars)
             bind_vars_index += 2
 
+        row = f'''{{
+            {f',{DELIMITER}'.join(groups_stmt)}
+        }}'''
         return Stmt(f'''
         {previous}
-        COLLECT {', '.join(by_fields_stmt)} INTO groups = {previous_result}
-        RETURN {{
-            {f',{DELIMITER}'.join(groups_stmt)}
-        }}
+        COLLECT {', '.join(by_fields_stmt)}{into_stmt}
+        {self._get_rows_tail_stmts(row, previous_result, prefix, bind_vars)}
         ''', bind_vars, result=self._get_result(DictResult(result)), aliases=self.aliases)
 
 
@@ -323,7 +488,7 @@ class Select(Query, Selected):
         result = {}
         for display_field, group_field in self.display_field_to_grouped.items():
             if isinstance(group_field, Field) and group_field.field in self.by_fields:
-                group_field.used_in_by = True
+                group_field = group_field._as_used_in_by()
 
             group_stmt = group_field._to_select_stmt(prefix=f'{prefix}_{bind_vars_index}', relative_to=stmt.returns,
                                                      alias_to_result=alias_to_result)
@@ -338,11 +503,12 @@ class Select(Query, Selected):
             bind_vars.update(b_vars)
             bind_vars_index += 2
 
+        row = f'''{{
+            {f',{DELIMITER}'.join(groups_stmt)}
+        }}'''
         return Stmt(f'''
         {previous}
-        RETURN {{
-            {f',{DELIMITER}'.join(groups_stmt)}
-        }}
+        {self._get_rows_tail_stmts(row, stmt.returns, prefix, bind_vars)}
         ''', bind_vars, result=self._get_result(DictResult(result)), aliases=self.aliases,
                     alias_to_result=alias_to_result)
 
@@ -392,15 +558,43 @@ class EdgeQuery(Filter, Grouped, Selected, InnerQuery):
             direction=self.direction,
         )
 
-    def _get_traversal_stmt(self, prefix: str, relative_to: str = '', alias_to_result: Dict[str, Result] = None):
+    def _uses_vertex_centric_indexes(self) -> bool:
+        # edge filters on a fixed depth path edge can be answered by the edge collections' vertex-centric indexes,
+        # the indexes starting with the vertex attribute the traversal follows
+        vertex_fields = {'OUTBOUND': ('_from',), 'INBOUND': ('_to',)}.get(self.direction, ('_from', '_to'))
+        return self.min_depth == self.max_depth and any(
+            index.fields and index.fields[0] in vertex_fields for e in self.edge_collections for index in e.indexes)
+
+    def _get_scope_aliases(self) -> List[str]:
+        if not self.outer_query:
+            return []
+
+        return self.outer_query.aliases + self.outer_query._get_scope_aliases()
+
+    def _get_traversal_variables(self, prefix: str) -> str:
+        if self._uses_vertex_centric_indexes():
+            return f'{prefix}_v, {prefix}_e, {prefix}_p'
+
+        return f'{prefix}_v, {prefix}_e'
+
+    def _get_edge_relative_to(self, prefix: str) -> str:
+        if self._uses_vertex_centric_indexes():
+            return f'{prefix}_p.edges[{self.max_depth - 1}]'
+
+        return f'{prefix}_e'
+
+    def _get_traversal_stmt(self, prefix: str, relative_to: str = '', alias_to_result: Dict[str, Result] = None,
+                            with_tail_stmts: bool = True):
         if not alias_to_result:
             alias_to_result = {}
 
         result = self._get_result(
             AnyResult([e.document_type for e in self.edge_collections]) if self.edge_collections else DOCUMENT_RESULT)
-        step_stmts, bind_vars, bind_vars_index = self._get_step_stmts(relative_to=f'{prefix}_e',
+        step_stmts, bind_vars, bind_vars_index = self._get_step_stmts(relative_to=self._get_edge_relative_to(prefix),
                                                                       returns=f'{prefix}_e' + self.attribute_return,
-                                                                      prefix=prefix)
+                                                                      prefix=prefix, with_tail_stmts=with_tail_stmts)
+        _, returns = self._get_dedup_returns(self._get_edge_relative_to(prefix), f'{prefix}_e' + self.attribute_return,
+                                             prefix)
 
         if self.outer_query:
             previous_stmt = self.outer_query._to_stmt(prefix=f'{prefix}_0', alias_to_result=alias_to_result)
@@ -410,21 +604,22 @@ class EdgeQuery(Filter, Grouped, Selected, InnerQuery):
 
             return Stmt(f'''
                 {previous_str}
-                    FOR {prefix}_v, {prefix}_e IN {self.min_depth}..{self.max_depth} {self.direction} {previous_stmt.returns}._id {traversal_edge_collection_names(self.edge_collections)}
+                    FOR {self._get_traversal_variables(prefix)} IN {self.min_depth}..{self.max_depth} {self.direction} {previous_stmt.returns}._id {traversal_edge_collection_names(self.edge_collections)}
                         {step_stmts}
-                ''', bind_vars, returns=f'{prefix}_e' + self.attribute_return, result=result, aliases=self.aliases,
+                ''', bind_vars, returns=returns, result=result, aliases=self.aliases,
                         alias_to_result=alias_to_result)
 
         return Stmt(f'''
-            FOR {prefix}_v, {prefix}_e IN {self.min_depth}..{self.max_depth} {self.direction} {relative_to}._id {traversal_edge_collection_names(self.edge_collections)}
+            FOR {self._get_traversal_variables(prefix)} IN {self.min_depth}..{self.max_depth} {self.direction} {relative_to}._id {traversal_edge_collection_names(self.edge_collections)}
                 {step_stmts}
-        ''', bind_vars, returns=f'{prefix}_e' + self.attribute_return, result=result, aliases=self.aliases)
+        ''', bind_vars, returns=returns, result=result, aliases=self.aliases)
 
     def _to_stmt(self, prefix: str = 'p', alias_to_result: Dict[str, Result] = None) -> Stmt:
         return self._get_traversal_stmt(prefix, alias_to_result=alias_to_result, relative_to=self.outer_query_returns)
 
     def _to_filter_stmt(self, prefix: str = 'p', relative_to: str = None) -> Stmt:
-        traversal_stmt = self._get_traversal_stmt(prefix, relative_to=relative_to)
+        # only whether a matching edge exists counts, so the dedup, sort and limit of the query are left out
+        traversal_stmt = self._get_traversal_stmt(prefix, relative_to=relative_to, with_tail_stmts=False)
         traversal_stmt.query_str = f'''
             LET {prefix}_sub = (
                 {traversal_stmt.query_str}
@@ -492,6 +687,7 @@ class DocumentQuery(Query, Selected):
         returns = f'o_{prefix}' + self.attribute_return
         step_stmts, bind_vars, bind_vars_index = self._get_step_stmts(returns=returns, relative_to=f'o_{prefix}',
                                                                       prefix=prefix, bind_vars_index=1)
+        _, returns = self._get_dedup_returns(f'o_{prefix}', returns, prefix)
 
         if self.collection:
             return Stmt(f'''
@@ -518,12 +714,13 @@ class DocumentQuery(Query, Selected):
         returns = f'o_{prefix}' + self.attribute_return
         step_stmts, bind_vars, bind_vars_index = self._get_step_stmts(returns=returns, relative_to=f'o_{prefix}',
                                                                       prefix=prefix, bind_vars_index=1)
+        _, returns = self._get_dedup_returns(f'o_{prefix}', returns, prefix)
 
         if self.collection:
             return Stmt(f'''
                     FOR o_{prefix} IN {self.collection.name}
                         {step_stmts}
-                    ''', bind_vars, returns=f'o_{prefix}' + self.attribute_return,
+                    ''', bind_vars, returns=returns,
                         result=VALUE_RESULT if self.attribute_return else self.collection.document_type,
                         aliases=self.aliases)
 
@@ -536,7 +733,7 @@ class DocumentQuery(Query, Selected):
                     LET previous = ({previous_str})
                         FOR o_{prefix} IN previous
                         {step_stmts}
-                    ''', bind_vars, returns=f'o_{prefix}{self.attribute_return}',
+                    ''', bind_vars, returns=returns,
                         result=VALUE_RESULT if self.attribute_return else self.collection.document_type,
                         aliases=self.aliases)
 
@@ -582,6 +779,26 @@ class EdgeTargetQuery(Filter, Grouped, InnerQuery):
     def _to_stmt(self, prefix: str = 'p', alias_to_result: Dict[str, Result] = None) -> Stmt:
         return self._get_traversal_stmt(prefix, f'{prefix}_v', alias_to_result)
 
+    def _get_scope_aliases(self) -> List[str]:
+        if not self.outer_query:
+            return []
+
+        return self.outer_query.aliases + self.outer_query._get_scope_aliases()
+
+    def _get_combined_tail_stmts(self, prefix: str, bind_vars: Dict[str, Any]) -> str:
+        # the edge query and its target share a single traversal loop, so both tails go after all of its filters
+        if self.outer_query.distinct:
+            raise ValueError('edges followed by a target query can not be deduplicated, deduplicate the target instead')
+
+        returns = f'{prefix}_v' + self.attribute_return
+        _, dedup_returns = self._get_dedup_returns(f'{prefix}_v', returns, prefix)
+        tail_stmts = [self.outer_query._get_tail_stmts(f'{prefix}_e', f'{prefix}_e', f'{prefix}_e', bind_vars),
+                      self.outer_query._get_alias_stmts(f'{prefix}_e' + self.outer_query.attribute_return),
+                      self._get_tail_stmts(f'{prefix}_v', returns, prefix, bind_vars),
+                      self._get_alias_stmts(dedup_returns)]
+
+        return DELIMITER.join(stmt for stmt in tail_stmts if stmt)
+
     def _get_traversal_stmt(self, prefix: str, relative_to: str, alias_to_result: Dict[str, Result] = None):
         if self.outer_query_returns:
             relative_to = self.outer_query_returns
@@ -595,7 +812,10 @@ class EdgeTargetQuery(Filter, Grouped, InnerQuery):
 
         step_stmts, bind_vars, bind_vars_index = self._get_step_stmts(relative_to=returns,
                                                                       returns=returns + self.attribute_return,
-                                                                      prefix=prefix, bind_vars_index=1)
+                                                                      prefix=prefix, bind_vars_index=1,
+                                                                      with_tail_stmts=not self.outer_query)
+
+        _, dedup_returns = self._get_dedup_returns(returns, returns + self.attribute_return, prefix)
 
         filter_target_collection = f'''FILTER {" OR ".join([f"IS_SAME_COLLECTION('{t.name}', {returns})" for t in self.target_collections])}''' if self.target_collections else ''
 
@@ -606,8 +826,9 @@ class EdgeTargetQuery(Filter, Grouped, InnerQuery):
             previous_str = ''
 
             outer_query_step_stmts, bind_vars, bind_vars_index = self.outer_query._get_step_stmts(
-                relative_to=f'{prefix}_e', bind_vars=bind_vars, bind_vars_index=bind_vars_index,
-                prefix=f'{prefix}', returns=f'{prefix}_e' + self.outer_query.attribute_return)
+                relative_to=self.outer_query._get_edge_relative_to(prefix), bind_vars=bind_vars,
+                bind_vars_index=bind_vars_index,
+                prefix=f'{prefix}', returns=f'{prefix}_e' + self.outer_query.attribute_return, with_tail_stmts=False)
 
             if self.outer_query.outer_query:
                 previous_stmt = self.outer_query.outer_query._to_stmt(f'{prefix}_0', alias_to_result=alias_to_result)
@@ -618,12 +839,12 @@ class EdgeTargetQuery(Filter, Grouped, InnerQuery):
 
             return Stmt(f'''
             {previous_str}
-            FOR {prefix}_v, {prefix}_e IN {self.outer_query.min_depth}..{self.outer_query.max_depth} {edge_query.direction} {relative_to}._id {",".join([e.name for e in edge_query.edge_collections]) if edge_query.edge_collections else ""}
+            FOR {self.outer_query._get_traversal_variables(prefix)} IN {self.outer_query.min_depth}..{self.outer_query.max_depth} {edge_query.direction} {relative_to}._id {",".join([e.name for e in edge_query.edge_collections]) if edge_query.edge_collections else ""}
                 {filter_target_collection}
                 {step_stmts}
                 {outer_query_step_stmts}
-            ''', bind_vars, alias_to_result=alias_to_result, returns=returns + self.attribute_return,
-                        result=result, aliases=self.aliases)
+                {self._get_combined_tail_stmts(prefix, bind_vars)}
+            ''', bind_vars, alias_to_result=alias_to_result, returns=dedup_returns, result=result, aliases=self.aliases)
 
         return Stmt(f'''
             {filter_target_collection}
@@ -646,7 +867,8 @@ class EdgeTargetQuery(Filter, Grouped, InnerQuery):
 
                 step_stmts, bind_vars, bind_vars_index = self._get_step_stmts(relative_to=relative_to,
                                                                               returns=returns + self.attribute_return,
-                                                                              prefix=prefix, bind_vars_index=0)
+                                                                              prefix=prefix, bind_vars_index=0,
+                                                                              with_tail_stmts=False)
 
                 previous_stmt = self.outer_query.outer_query._to_stmt(f'{prefix}_0')
                 previous_str, previous_bind_vars = previous_stmt.expand_without_return()
@@ -656,16 +878,18 @@ class EdgeTargetQuery(Filter, Grouped, InnerQuery):
             else:
                 step_stmts, bind_vars, bind_vars_index = self._get_step_stmts(relative_to=returns,
                                                                               returns=returns + self.attribute_return,
-                                                                              prefix=prefix, bind_vars_index=0)
+                                                                              prefix=prefix, bind_vars_index=0,
+                                                                              with_tail_stmts=False)
 
             outer_query_step_stmts, bind_vars, bind_vars_index = self.outer_query._get_step_stmts(
-                relative_to=f'{prefix}_e', bind_vars=bind_vars, bind_vars_index=bind_vars_index,
-                prefix=f'{prefix}', returns=f'{prefix}_e' + self.outer_query.attribute_return)
+                relative_to=self.outer_query._get_edge_relative_to(prefix), bind_vars=bind_vars,
+                bind_vars_index=bind_vars_index,
+                prefix=f'{prefix}', returns=f'{prefix}_e' + self.outer_query.attribute_return, with_tail_stmts=False)
 
             return Stmt(f'''
             LET {prefix}_sub = (
                 {previous_str}
-                FOR {prefix}_v, {prefix}_e IN {self.outer_query.min_depth}..{self.outer_query.max_depth} {edge_query.direction} {relative_to}._id {",".join([e.name for e in edge_query.edge_collections]) if edge_query.edge_collections else ""}
+                FOR {self.outer_query._get_traversal_variables(prefix)} IN {self.outer_query.min_depth}..{self.outer_query.max_depth} {edge_query.direction} {relative_to}._id {",".join([e.name for e in edge_query.edge_collections]) if edge_query.edge_collections else ""}
                     {filter_target_collection}
                     {step_stmts}
                     {outer_query_step_stmts}
@@ -678,7 +902,8 @@ class EdgeTargetQuery(Filter, Grouped, InnerQuery):
 
         step_stmts, bind_vars, bind_vars_index = self._get_step_stmts(relative_to=relative_to,
                                                                       returns=returns + self.attribute_return,
-                                                                      prefix=prefix, bind_vars_index=0)
+                                                                      prefix=prefix, bind_vars_index=0,
+                                                                      with_tail_stmts=False)
 
         return Stmt(f'''
             LET {prefix}_sub = (
@@ -728,6 +953,9 @@ class Array(Query):
         self.attribute_return_list.append(selection)
         return self
 
+    def _get_scope_aliases(self) -> List[str]:
+        return self.outer_query.aliases + self.outer_query._get_scope_aliases()
+
     def _to_stmt(self, prefix: str = 'p', alias_to_result: Dict[str, Result] = None) -> Stmt:
         if not alias_to_result:
             alias_to_result = {}
@@ -736,15 +964,23 @@ class Array(Query):
         step_stmts, bind_vars, bind_vars_index = self._get_step_stmts(relative_to=returns,
                                                                       returns=f'array_{prefix}' + self.attribute_return,
                                                                       prefix=prefix, bind_vars_index=1)
-
-        self.inner_query.outer_query_returns = f'oqr_{prefix}'
+        _, dedup_returns = self._get_dedup_returns(returns, returns + self.attribute_return, prefix)
 
         outer_stmt = self.outer_query._to_stmt(f'{prefix}_0', alias_to_result=alias_to_result)
         alias_to_result.update(outer_stmt.alias_to_result)
         outer_str, outer_bind_vars = outer_stmt.expand_without_return()
         bind_vars.update(outer_bind_vars)
 
-        inner_stmt = self.inner_query._to_stmt(f'{prefix}_1', alias_to_result=alias_to_result)
+        # inner traversals are only pointed at the outer query while compiling, so the query itself is left unchanged
+        if not isinstance(self.inner_query, InnerQuery):
+            inner_stmt = self.inner_query._to_stmt(f'{prefix}_1', alias_to_result=alias_to_result)
+        else:
+            outer_query_returns = self.inner_query.outer_query_returns
+            self.inner_query.outer_query_returns = f'oqr_{prefix}'
+            try:
+                inner_stmt = self.inner_query._to_stmt(f'{prefix}_1', alias_to_result=alias_to_result)
+            finally:
+                self.inner_query.outer_query_returns = outer_query_returns
         alias_to_result.update(inner_stmt.alias_to_result)
         inner_str, inner_bind_vars = inner_stmt.expand()
         bind_vars.update(inner_bind_vars)
@@ -756,7 +992,7 @@ class Array(Query):
                 {inner_str}
             )
             {step_stmts}
-        ''', bind_vars=bind_vars, returns=returns + self.attribute_return, alias_to_result=alias_to_result,
+        ''', bind_vars=bind_vars, returns=dedup_returns, alias_to_result=alias_to_result,
                     aliases=self.aliases,
                     result=self._get_result(ListResult(inner_stmt.result)))
 
@@ -773,6 +1009,25 @@ def gt(attribute: str, compare_value: Any) -> AttributeFilter:
     return AttributeFilter(attribute=attribute, operator='>', compare_value=compare_value)
 
 
+def in_(attribute: str, values: Iterable[Any]) -> AttributeFilter:
+    # the values are bound as a single array, so the statement is the same whatever their number
+    return AttributeFilter(attribute=attribute, operator='IN', compare_value=_get_values(values))
+
+
+def not_in(attribute: str, values: Iterable[Any]) -> AttributeFilter:
+    return AttributeFilter(attribute=attribute, operator='NOT IN', compare_value=_get_values(values))
+
+
+def _get_values(values: Iterable[Any]) -> Any:
+    if isinstance(values, (list, Var, Param)):
+        return values
+
+    if isinstance(values, (str, bytes, dict)):
+        raise TypeError(f'expected a collection of values, got {type(values).__name__}')
+
+    return list(values)
+
+
 def out(*edge_collection_types: Type['Edge'], min_depth: int = None, max_depth: int = None) -> EdgeQuery:
     return EdgeQuery(
         outer_query_returns='',
@@ -846,3 +1101,18 @@ def var(expression: str):
     v = Var(_name=expression)
     return v
 
+
+@dataclass
+class Param:
+    name: str
+
+
+def param(name: str) -> Param:
+    return Param(name=name)
+
+
+@dataclass
+class BoundValue:
+    """A value of the query other than a filter's, sent as a bind var and left out of the query's shape."""
+    compare_value: Any
+
@@ -1,22 +1,56 @@
 import itertools
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, MutableMapping
 
 from _collection import Collection
 
 
+def load_value(data):
+    return data
+
+
+def get_identity_loader(load: Callable[[Any], Any], identity_map: MutableMapping[str, Any] = None):
+    # documents already in the identity map are returned as they are instead of being hydrated again
+    if identity_map is None:
+        return load
+
+    def load_document(data):
+        document_id = data.get('_id')
+        if document_id is None:
+            return load(data)
+
+        document = identity_map.get(document_id)
+        if document is None:
+            document = identity_map[document_id] = load(data)
+
+        return document
+
+    return load_document
+
+
 @dataclass
 class Result:
+    __slots__ = ()
+
     def _load(self, data, collection_definition: Dict[str, Collection]) -> Any:
         pass
 
+    def _get_loader(self, collection_definition: Dict[str, Collection],
+                    identity_map: MutableMapping[str, Any] = None) -> Callable[[Any], Any]:
+        # a loader hydrates rows like _load, with the walk over the result tree done once instead of per row
+        return lambda data: self._load(data, collection_definition)
+
 
 @dataclass
 class ValueResult(Result):
     def _load(self, data, collection_definition: Dict[str, Collection]) -> Any:
         return data
 
+    def _get_loader(self, collection_definition: Dict[str, Collection],
+                    identity_map: MutableMapping[str, Any] = None) -> Callable[[Any], Any]:
+        return load_value
+
     def __getitem__(self, item):
         return VALUE_RESULT
 
@@ -28,6 +62,14 @@ class ListResult(Result):
     def _load(self, data, collection_definition: Dict[str, Collection]) -> Any:
         return list(map(self.inner_result._load, data, itertools.repeat(collection_definition)))
 
+    def _get_loader(self, collection_definition: Dict[str, Collection],
+                    identity_map: MutableMapping[str, Any] = None) -> Callable[[Any], Any]:
+        inner_loader = self.inner_result._get_loader(collection_definition, identity_map)
+        if inner_loader is load_value:
+            return list
+
+        return lambda data: [inner_loader(value) for value in data]
+
     def __getitem__(self, item):
         return self.inner_result
 
@@ -41,6 +83,29 @@ class DocumentResult(Result):
         return collection_definition.get(collection_name, ValueResult).document_type._load(data,
                                                                                            collection_definition)
 
+    def _get_loader(self, collection_definition: Dict[str, Collection],
+                    identity_map: MutableMapping[str, Any] = None) -> Callable[[Any], Any]:
+        # collections are looked up once per name; documents of undefined collections are returned as is
+        collection_name_to_loader = {}
+
+        def load(data):
+            if not data:
+                return {}
+
+            collection_name = data['_id'].partition('/')[0]
+            loader = collection_name_to_loader.get(collection_name)
+            if loader is None:
+                collection = collection_definition.get(collection_name)
+                if collection is None:
+                    return data
+
+                loader = collection_name_to_loader[collection_name] = collection.document_type._get_loader(
+                    collection_definition, identity_map)
+
+            return loader(data)
+
+        return load
+
     def __getitem__(self, _item):
         return VALUE_RESULT
 
@@ -53,6 +118,15 @@ class DictResult(Result):
         return {key: self.display_name_to_result[key]._load(value, collection_definition) for key, value in
                 data.items()}
 
+    def _get_loader(self, collection_definition: Dict[str, Collection],
+                    identity_map: MutableMapping[str, Any] = None) -> Callable[[Any], Any]:
+        key_to_loader = {key: result._get_loader(collection_definition, identity_map) for key, result in
+                         self.display_name_to_result.items()}
+        if all(loader is load_value for loader in key_to_loader.values()):
+            return dict
+
+        return lambda data: {key: key_to_loader[key](value) for key, value in data.items()}
+
     def __getitem__(self, item):
         return self.display_name_to_result[item]
 
@@ -67,3 +141,7 @@ class AnyResult(Result):
 
     def _load(self, data, collection_definition: Dict[str, Collection]) -> Any:
         return DOCUMENT_RESULT._load(data, collection_definition)
+
+    def _get_loader(self, collection_definition: Dict[str, Collection],
+                    identity_map: MutableMapping[str, Any] = None) -> Callable[[Any], Any]:
+        return DOCUMENT_RESULT._get_loader(collection_definition, identity_map)
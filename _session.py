@@ -0,0 +1,190 @@
+from copy import deepcopy
+from inspect import isclass
+from typing import Dict, Any, List, Union, Iterable, Type, Tuple
+
+from _compiled import PreparedQuery
+from _db import DB, TEdge
+from _document import Document
+from _query import Query
+from _utils import chunks
+
+MISSING = object()
+
+
+class IdentityMap(dict):
+    """
+    Identity map keeping, next to every document, a copy of its dump as it was loaded or last flushed.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.snapshots: Dict[str, dict] = {}
+
+    def __setitem__(self, document_id: str, document: Document):
+        super().__setitem__(document_id, document)
+        # lists and dicts are changed in place, so the snapshot must not share them with the document
+        self.snapshots[document_id] = deepcopy(document._dump())
+
+    def pop(self, document_id: str, *default):
+        self.snapshots.pop(document_id, None)
+        return super().pop(document_id, *default)
+
+    def clear(self):
+        super().clear()
+        self.snapshots.clear()
+
+    def get_changes(self, document_id: str) -> Dict[str, Any]:
+        document, snapshot = self[document_id], self.snapshots[document_id]
+        return {key: value for key, value in document._dump().items()
+                if key not in document.INIT_PROPERTIES and snapshot.get(key, MISSING) != value}
+
+
+class Session:
+    """
+    Unit of work on `db` with an identity map: a document appearing many times across the results of the session's
+    queries is hydrated once, and the same object is returned every time, as it was first loaded.
+    `add`, `update` and `set` are recorded and sent on `flush`, together with the changed attributes of the
+    documents loaded by the session, in bulk requests of up to `chunk_size` documents per collection.
+    Leaving the session as a context manager flushes it, unless an exception was raised, and then clears it.
+    """
+
+    def __init__(self, db: DB, chunk_size: int = 1000):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.identity_map = IdentityMap()
+        self._new: List[Document] = []
+        self._updated: Dict[int, Document] = {}
+        self._edges: List[Tuple[Union[Query, Document, str], Union[Type, TEdge], Union[Query, Document, str],
+                                Dict[str, Any]]] = []
+
+    def __enter__(self) -> 'Session':
+        return self
+
+    def __exit__(self, exc_type, *_):
+        try:
+            if exc_type is None:
+                self.flush()
+        finally:
+            self.clear()
+
+    def __contains__(self, document_id: str) -> bool:
+        return document_id in self.identity_map
+
+    def __len__(self) -> int:
+        return len(self.identity_map)
+
+    def _get_query_results(self, query: Union[Query, PreparedQuery], params: Dict[str, Any] = None) -> Iterable:
+        return self.db._get_query_results(query, params, identity_map=self.identity_map)
+
+    def get(self, query: Union[Query, PreparedQuery], params: Dict[str, Any] = None) -> Any:
+        return self.db._first(self._get_query_results(query, params))
+
+    def get_many(self, query: Union[Query, PreparedQuery], params: Dict[str, Any] = None) -> List[Any]:
+        return list(self._get_query_results(query, params))
+
+    def get_document(self, document_id: str) -> Union[Document, None]:
+        return self.identity_map.get(document_id)
+
+    def add(self, document: Document) -> Document:
+        self._new.append(document)
+        return document
+
+    def update(self, document: Document) -> Document:
+        # documents loaded by the session are tracked anyway, others are sent whole
+        if self.identity_map.get(document._id) is not document:
+            self._updated.setdefault(id(document), document)
+
+        return document
+
+    def set(self, from_: Union[Query, Document, str], edge_document: Union[Type, TEdge],
+            to_: Union[Query, Document, str], data: Dict[str, Any] = None):
+        self._edges.append((from_, edge_document, to_, data))
+
+    def expunge(self, document: Document):
+        self.identity_map.pop(document._id, None)
+
+    def clear(self):
+        self.identity_map.clear()
+        self._new.clear()
+        self._updated.clear()
+        self._edges.clear()
+
+    def flush(self):
+        self._flush_new()
+        self._flush_updated()
+        self._flush_edges()
+
+    def _flush_new(self):
+        if not self._new:
+            return
+
+        revs = [document._rev for document in self._new]
+
+        try:
+            self.db.add_many(self._new, chunk_size=self.chunk_size)
+        finally:
+            # documents inserted before a failure got their meta set, they must not be inserted again
+            inserted = {id(document) for document, rev in zip(self._new, revs)
+                        if document._id and document._rev != rev}
+
+            for document in self._new:
+                if id(document) in inserted:
+                    self.identity_map[document._id] = document
+
+            self._new = [document for document in self._new if id(document) not in inserted]
+
+    def _flush_updated(self):
+        documents, changes = [], []
+
+        for document_id, document in self.identity_map.items():
+            document_changes = self.identity_map.get_changes(document_id)
+            if document_changes:
+                documents.append(document)
+                changes.append(document_changes)
+
+        for document in self._updated.values():
+            documents.append(document)
+            changes.append(document._dump())
+
+        if not documents:
+            return
+
+        results = self.db.update_many(documents, chunk_size=self.chunk_size, changes=changes)
+
+        # failed documents stay recorded, or changed for the loaded ones, to be sent again on the next flush
+        for document, result in zip(documents, results):
+            if not isinstance(result, Exception):
+                self._updated.pop(id(document), None)
+                self.identity_map[document._id] = document
+
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+
+    def _flush_edges(self):
+        # edges are forgotten once their request succeeded, so a failed flush does not send any edge twice
+        edge_type_to_pairs = {}
+        sent = set()
+
+        try:
+            for index, (from_, edge_document, to_, data) in enumerate(self._edges):
+                if isinstance(from_, Query) or isinstance(to_, Query):
+                    self.db.set(from_, edge_document, to_, data)
+                    sent.add(index)
+                    continue
+
+                edge_type = edge_document if isclass(edge_document) else type(edge_document)
+                edge = dict(data or {}) if isclass(edge_document) else edge_document
+                edge_type_to_pairs.setdefault(edge_type, []).append((index, (from_, to_, edge)))
+
+            for edge_type, indexed_pairs in edge_type_to_pairs.items():
+                for chunk in chunks(indexed_pairs, self.chunk_size):
+                    pairs = [pair for _, pair in chunk]
+                    self.db.set_many(edge_type, pairs, chunk_size=self.chunk_size)
+                    sent.update(index for index, _ in chunk)
+
+                    for _, _, edge in pairs:
+                        if isinstance(edge, Document):
+                            self.identity_map[edge._id] = edge
+        finally:
+            self._edges = [edge for index, edge in enumerate(self._edges) if index not in sent]
@@ -1,5 +1,6 @@
 import re
-from typing import Tuple, Dict, Any
+from itertools import islice
+from typing import Tuple, Dict, Any, Iterable, Iterator, List
 
 
 class classproperty():
@@ -30,3 +31,12 @@ def returns(return_entity: str):
         return inner_function
 
     return decorator
+
+
+def chunks(iterable: Iterable, chunk_size: int) -> Iterator[List]:
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, chunk_size))
+
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, chunk_size))
@@ -0,0 +1,41 @@
+"""
+Compares the registered codecs encoding and decoding cursor responses of Company documents.
+
+    python -m bench.bench_codec [--rows 1000] [--repeat 200]
+"""
+import argparse
+import time
+from datetime import datetime
+
+from _codec import CODECS
+
+
+def run(function, value, repeat: int) -> float:
+    start = time.perf_counter()
+
+    for _ in range(repeat):
+        function(value)
+
+    return repeat / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    response = {'result': [{'_id': f'company/{i}', '_key': str(i), '_rev': '_fX2oVsW---', 'name': f'company {i}',
+                            'employee_number': i, 'industry': 'fin', 'founded': datetime(2000, 1, 1),
+                            'tags': ['public', 'audited'], 'address': {'city': 'Tel Aviv', 'zip': '6100000'}}
+                           for i in range(args.rows)],
+                'hasMore': False, 'cached': False, 'error': False, 'code': 201}
+
+    for codec in CODECS.values():
+        encoded = codec.serializer(response)
+        print(f'{codec.name:8} encode: {run(codec.serializer, response, args.repeat):8,.1f} responses/s  '
+              f'decode: {run(codec.deserializer, encoded, args.repeat):8,.1f} responses/s')
+
+
+if __name__ == '__main__':
+    main()
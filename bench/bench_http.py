@@ -0,0 +1,84 @@
+"""
+Compares the default ArangoClient HTTP client with PooledHTTPClient under concurrent DB.get_many calls, against a
+local stand-in for the ArangoDB HTTP API.
+
+    python -m bench.bench_http [--threads 32] [--queries 200]
+"""
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from _db import DB
+from _http import PooledHTTPClient
+from test.test_classes import Company
+
+GRAPHS = {'graphs': [{'_id': '_graphs/main', '_key': 'main', '_rev': '1', 'orphanCollections': [],
+                      'edgeDefinitions': []}]}
+CURSOR = {'result': [{'_id': f'company/{i}', '_key': str(i), '_rev': '1', 'name': f'company {i}',
+                      'employee_number': i, 'industry': 'fin'} for i in range(20)],
+          'hasMore': False, 'cached': False, 'error': False, 'code': 201}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    connections = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with StandInHandler.lock:
+            StandInHandler.connections += 1
+
+    def _reply(self, body: dict, status: int = 200):
+        raw_body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(raw_body)))
+        self.end_headers()
+        self.wfile.write(raw_body)
+
+    def do_GET(self):
+        self._reply(GRAPHS)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self._reply(CURSOR, status=201)
+
+    def log_message(self, *_):
+        pass
+
+
+def run(db: DB, threads: int, queries: int) -> float:
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda _: db.get_many(Company.match(name='company 1')), range(threads * queries)))
+
+    return threads * queries / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    hosts = f'http://127.0.0.1:{server.server_port}'
+
+    for name, http_client in (('default', None),
+                              ('pooled', PooledHTTPClient(max_connections_per_host=args.threads, timeout=10))):
+        StandInHandler.connections = 0
+        db = DB('bench', 'root', '', hosts=hosts, http_client=http_client)
+        queries_per_second = run(db, args.threads, args.queries)
+        print(f'{name:>8}: {queries_per_second:10.0f} queries/s, {StandInHandler.connections} connections opened')
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""
+Compares hydrating Company rows through the decorator generated __init__, as Document._load used to, with the
+hydration loader.
+
+    python -m bench.bench_load [--rows 1000000]
+"""
+import argparse
+import time
+
+from test.test_classes import Company
+
+COLLECTION_DEFINITION = {'company': Company._get_collection()}
+
+
+def run(load, rows: list) -> float:
+    start = time.perf_counter()
+
+    for row in rows:
+        load(row)
+
+    return len(rows) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000)
+    args = parser.parse_args()
+
+    rows = [{'_id': f'company/{i}', '_key': str(i), '_rev': '1', 'name': f'company {i}', 'employee_number': i,
+             'industry': 'fin'} for i in range(args.rows)]
+
+    print(f'__init__: {run(lambda row: Company(**row), rows):,.0f} rows/s')
+    print(f'loader:   {run(Company._get_loader(COLLECTION_DEFINITION), rows):,.0f} rows/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+import asyncio
+import json
+
+import pytest
+from arango.exceptions import ArangoServerError
+
+from _async_db import AsyncDB
+from test.test_classes import Company
+from test.test_db import get_company_rows
+
+
+class FakeResponse:
+    def __init__(self, url, status, body):
+        self.url = url
+        self.status = status
+        self.reason = 'OK' if status < 400 else 'Error'
+        self.headers = {}
+        self.body = body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_):
+        pass
+
+    async def text(self):
+        return '' if self.body is None else json.dumps(self.body)
+
+
+class FakeSession:
+    """Records the requests sent by AsyncDB and answers them with `handler(method, endpoint, data)`."""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+
+    def request(self, method, url, data=None, headers=None):
+        endpoint = url.split('/_db/test', 1)[1]
+        data = None if data is None else json.loads(data)
+        self.requests.append((method, endpoint, data))
+        self.headers = headers
+        status, body = self.handler(method, endpoint, data)
+        return FakeResponse(url, status, body)
+
+
+def get_cursor_handler(rows, batch_size):
+    batches = [rows[index:index + batch_size] for index in range(0, len(rows), batch_size)]
+
+    def handler(method, endpoint, data):
+        if method == 'delete':
+            return 202, {'id': '1'}
+
+        batch = batches.pop(0)
+        return 201, {'id': '1', 'result': batch, 'hasMore': bool(batches)}
+
+    return handler
+
+
+def get_async_db(handler) -> AsyncDB:
+    db = AsyncDB('test', 'root', '', session=FakeSession(handler))
+    db.collection_definition['company'] = Company._get_collection()
+    return db
+
+
+def test_iter_batches():
+    db = get_async_db(get_cursor_handler(get_company_rows(5), batch_size=2))
+
+    async def collect():
+        return [company async for company in db.iter(Company.match(industry='fin'), batch_size=2)]
+
+    companies = asyncio.run(collect())
+
+    assert [company.name for company in companies] == ['0', '1', '2', '3', '4']
+    assert isinstance(companies[0], Company)
+    assert [(method, endpoint) for method, endpoint, _ in db.session.requests] == [
+        ('post', '/_api/cursor'), ('put', '/_api/cursor/1'), ('put', '/_api/cursor/1')]
+    assert db.session.requests[0][2]['bindVars'] == {'p_1': 'fin'}
+    assert db.session.requests[0][2]['batchSize'] == 2
+
+
+def test_get_deletes_unfinished_cursor():
+    db = get_async_db(get_cursor_handler(get_company_rows(5), batch_size=2))
+
+    company = asyncio.run(db.get(Company.match()))
+
+    assert company.name == '0'
+    assert [(method, endpoint) for method, endpoint, _ in db.session.requests] == [
+        ('post', '/_api/cursor'), ('delete', '/_api/cursor/1')]
+
+
+def test_add_ensures_collection_once():
+    def handler(method, endpoint, data):
+        if endpoint == '/_api/collection/company':
+            return 404, {'error': True, 'errorNum': 1203, 'errorMessage': 'collection not found'}
+        if endpoint == '/_api/document/company':
+            return 202, {'_id': 'company/1', '_key': '1', '_rev': 'a'}
+        return 200, {}
+
+    db = get_async_db(handler)
+
+    async def add():
+        return [await db.add(Company(name, 1, 'fin')) for name in 'ab']
+
+    first, _ = asyncio.run(add())
+
+    assert first._id == 'company/1'
+    assert [(method, endpoint) for method, endpoint, _ in db.session.requests] == [
+        ('get', '/_api/collection/company'), ('post', '/_api/collection'), ('post', '/_api/document/company'),
+        ('post', '/_api/document/company')]
+
+
+def test_server_error():
+    db = get_async_db(lambda *_: (400, {'error': True, 'errorNum': 1501, 'errorMessage': 'syntax error'}))
+
+    with pytest.raises(ArangoServerError, match='syntax error'):
+        asyncio.run(db.get_many(Company.match()))
+
+
+def test_requests_are_authorized():
+    db = AsyncDB('test', 'root', 'secret', session=FakeSession(lambda *_: (200, {'collections': []})))
+
+    asyncio.run(db._request('get', '/_api/collection'))
+
+    assert db.session.headers['authorization'] == 'Basic cm9vdDpzZWNyZXQ='
+
+
+def test_update_checks_revision():
+    def handler(method, endpoint, data):
+        if endpoint.startswith('/_api/document/company/1'):
+            return 412, {'error': True, 'errorNum': 1200, 'errorMessage': 'conflict, _rev values do not match'}
+        return 200, {}
+
+    db = get_async_db(handler)
+    company = Company('acme', 1, 'fin', _id='company/1', _key='1', _rev='stale')
+
+    with pytest.raises(ArangoServerError, match='conflict'):
+        asyncio.run(db.update(company))
+
+    method, endpoint, data = db.session.requests[-1]
+    assert (method, endpoint) == ('patch', '/_api/document/company/1?ignoreRevs=false')
+    assert data['_rev'] == 'stale'
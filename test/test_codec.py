@@ -0,0 +1,27 @@
+from datetime import datetime
+
+import pytest
+
+from _codec import CODECS, Codec, get_codec, register_codec
+
+DOCUMENT = {'name': 'acme', 'employee_number': 3, 'founded': datetime(2000, 1, 2, 3, 4, 5), 'tags': ['a', None]}
+
+
+@pytest.mark.parametrize('name', list(CODECS))
+def test_codec_round_trip(name):
+    codec = get_codec(name)
+    encoded = codec.serializer(DOCUMENT)
+
+    assert isinstance(encoded, str)
+    assert codec.deserializer(encoded) == {**DOCUMENT, 'founded': str(DOCUMENT['founded'])}
+
+
+def test_get_codec():
+    codec = Codec('identity', str, str)
+
+    assert get_codec(codec) is codec
+    assert register_codec(codec) is get_codec('identity')
+
+    del CODECS['identity']
+    with pytest.raises(ValueError):
+        get_codec('identity')
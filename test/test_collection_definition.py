@@ -1,7 +1,11 @@
+import weakref
 from dataclasses import dataclass
 from datetime import datetime, timedelta
+from typing import Optional
 
-from _collection import Collection
+import pytest
+
+from _collection import Collection, persistent_index, hash_index, ttl_index, geo_index, fulltext_index
 from _collection_definition import collection, edge_collection
 
 
@@ -166,4 +170,117 @@ def test_dataclass_edge():
     assert col.name == 'subsidiary_of'
     assert col.document_type == SubsidiaryOf
     assert col.from_collections == [Collection(name='company', document_type=Company)]
-    assert col.to_collections == [Collection(name='company', document_type=Company)]
\ No newline at end of file
+    assert col.to_collections == [Collection(name='company', document_type=Company)]
+
+
+def test_collection_indexes():
+    @collection('company', indexes=[persistent_index('name', unique=True), hash_index('industry', sparse=True),
+                                    ttl_index('created_at', expire_after=3600)])
+    class Company:
+        def __init__(self, name: str, industry: str):
+            self.name = name
+            self.industry = industry
+
+    name_index, industry_index, ttl = Company._get_collection().indexes
+
+    assert name_index.type == 'persistent' and name_index.fields == ['name']
+    assert name_index._matches({'type': 'persistent', 'fields': ['name'], 'unique': True, 'sparse': False})
+    assert not name_index._matches({'type': 'persistent', 'fields': ['name'], 'unique': False, 'sparse': False})
+    assert industry_index._matches({'type': 'persistent', 'fields': ['industry'], 'unique': False, 'sparse': True})
+    assert not industry_index._matches({'type': 'persistent', 'fields': ['name'], 'unique': False, 'sparse': True})
+    assert ttl.options == {'expiry_time': 3600}
+    assert ttl._matches({'type': 'ttl', 'fields': ['created_at'], 'sparse': True, 'unique': False,
+                         'expiry_time': 3600})
+    assert not ttl._matches({'type': 'ttl', 'fields': ['created_at'], 'sparse': True, 'unique': False,
+                             'expiry_time': 60})
+
+
+def test_index_type_options():
+    geo = geo_index('location', geo_json=True)
+    fulltext = fulltext_index('description')
+
+    assert geo._matches({'type': 'geo', 'fields': ['location'], 'sparse': True, 'unique': False, 'geo_json': True})
+    assert geo._matches({'type': 'geo1', 'fields': ['location'], 'sparse': True, 'unique': False, 'geo_json': True})
+    assert not geo._matches({'type': 'geo', 'fields': ['location'], 'sparse': True, 'unique': False,
+                             'geo_json': False})
+    assert fulltext._matches({'type': 'fulltext', 'fields': ['description'], 'sparse': True, 'unique': False,
+                              'min_length': 2})
+    assert not fulltext_index('description', min_length=3)._matches(
+        {'type': 'fulltext', 'fields': ['description'], 'sparse': True, 'unique': False, 'min_length': 2})
+
+
+def test_slots_dataclass():
+    @collection('company', slots=True)
+    @dataclass
+    class Company:
+        name: str
+        employee_number: int = 30
+
+    @edge_collection('subsidiary_of', from_collections=[Company], to_collections=[Company], slots=True)
+    @dataclass
+    class SubsidiaryOf:
+        since: datetime
+
+    company = Company('name', _key='1')
+    subsidiary_of = SubsidiaryOf(since=datetime(2020, 1, 1), _from='company/1', _to='company/2')
+
+    assert not hasattr(company, '__dict__')
+    assert not hasattr(subsidiary_of, '__dict__')
+    assert company.employee_number == 30
+    assert company._dump() == {'_key': '1', 'name': 'name', 'employee_number': 30}
+    assert subsidiary_of._dump() == {'_from': 'company/1', '_to': 'company/2', 'since': '2020-01-01 00:00:00'}
+    assert Company._load({'_id': 'company/2', 'name': 'other'}, {}) == Company('other', _id='company/2')
+    assert weakref.ref(company)() is company
+
+
+def test_slots_init_class():
+    @collection('company', slots=True)
+    class Company:
+        name: str
+        employee_number: int
+
+        def __init__(self, name: str, employee_number: int = 30):
+            self.name = name
+            self.employee_number = employee_number
+
+    company = Company('name', _key='1')
+
+    assert not hasattr(company, '__dict__')
+    assert company._dump() == {'_key': '1', 'name': 'name', 'employee_number': 30}
+    assert weakref.ref(company)() is company
+
+    with pytest.raises(TypeError):
+        @collection('company', slots=True)
+        class Unannotated:
+            def __init__(self, name: str):
+                self.name = name
+
+    with pytest.raises(TypeError):
+        @collection('company', slots=True)
+        class WithDefault:
+            name: str = 'name'
+
+
+def test_dump_does_not_mutate():
+    @collection('company')
+    class Company:
+        def __init__(self, name: str, founded: datetime):
+            self.name = name
+            self.founded = founded
+
+    @edge_collection('subsidiary_of', from_collections=[Company], to_collections=[Company])
+    @dataclass
+    class SubsidiaryOf:
+        since: datetime
+        until: Optional[datetime] = None
+        share: float = 1.0
+
+    company = Company('name', founded=datetime(2000, 1, 1))
+    subsidiary_of = SubsidiaryOf(since=datetime(2020, 1, 1), _from='company/1', _to='company/2')
+
+    assert company._dump() == {'name': 'name', 'founded': '2000-01-01 00:00:00'}
+    assert company.founded == datetime(2000, 1, 1)
+    assert company._key is None
+    assert subsidiary_of._dump() == {'_from': 'company/1', '_to': 'company/2', 'since': '2020-01-01 00:00:00',
+                                     'until': None, 'share': 1.0}
+    assert subsidiary_of.since == datetime(2020, 1, 1)
@@ -0,0 +1,331 @@
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from _db import DB, BulkInsertError
+from _http import PooledHTTPClient
+from _profile import QueryProfiler
+from _query import gt
+from test.test_classes import Company, Country, LocatedIn
+
+
+class FakeCursor:
+    def __init__(self, rows, batch_size=1000):
+        self.batches = [rows[index:index + batch_size] for index in range(0, len(rows), batch_size)] or [[]]
+        self._batch = list(self.batches.pop(0))
+        self.fetch_count = 0
+        self.closed = False
+
+    def __iter__(self):
+        while True:
+            while self._batch:
+                yield self._batch.pop(0)
+
+            if not self.has_more():
+                return
+            self.fetch()
+
+    def batch(self):
+        return self._batch
+
+    def has_more(self):
+        return bool(self.batches)
+
+    def fetch(self):
+        self.fetch_count += 1
+        self._batch.extend(self.batches.pop(0))
+
+    def close(self, ignore_missing=False):
+        self.closed = True
+
+    def statistics(self):
+        return {'scannedFull': 0}
+
+    def profile(self):
+        return None
+
+
+class FakeAQL:
+    def __init__(self, database):
+        self.database = database
+
+    def execute(self, query_str, bind_vars=None, **options):
+        self.database.calls.append(('execute', query_str, bind_vars, options))
+        rows = self.database.get_rows(bind_vars)
+        if isinstance(rows, Exception):
+            raise rows
+
+        cursor = self.database.cursors[len(self.database.cursors)] = FakeCursor(rows, options.get('batch_size', 1000))
+        return cursor
+
+
+class FakeCollection:
+    def __init__(self, database, name):
+        self.database = database
+        self.name = name
+
+    def indexes(self):
+        return []
+
+    def insert_many(self, documents):
+        self.database.calls.append(('insert_many', self.name, documents))
+        return [self.database.get_result(self.name, document) for document in documents]
+
+    def update_many(self, documents):
+        self.database.calls.append(('update_many', self.name, documents))
+        return [self.database.get_result(self.name, document) for document in documents]
+
+
+class FakeGraph:
+    def has_edge_definition(self, name):
+        return True
+
+    def edge_collection(self, name):
+        return name
+
+
+class FakeDatabase:
+    """
+    Records the calls made by DB; `rows` holds, in order, the rows or the error of each AQL execution, or is called
+    with its bind vars to return them, and `failures` the names of the documents whose write fails.
+    """
+
+    def __init__(self, rows=None, failures=()):
+        self.rows = rows if callable(rows) else list(rows or [])
+        self.failures = set(failures)
+        self.calls = []
+        self.cursors = {}
+        self.aql = FakeAQL(self)
+        self.inserted = 0
+
+    def get_result(self, collection_name, document):
+        if document.get('name') in self.failures:
+            return ValueError(f'failed {document["name"]}')
+
+        self.inserted += 1
+        key = document.get('_key') or str(self.inserted)
+        return {'_id': f'{collection_name}/{key}', '_key': key, '_rev': f'rev{self.inserted}'}
+
+    def get_rows(self, bind_vars):
+        if callable(self.rows):
+            return self.rows(bind_vars)
+
+        return self.rows.pop(0) if self.rows else []
+
+    def has_graph(self, name):
+        return True
+
+    def graph(self, name):
+        return FakeGraph()
+
+    def has_collection(self, name):
+        return True
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def __getitem__(self, name):
+        return FakeCollection(self, name)
+
+
+class FakeClient:
+    def __init__(self, database, http_client=None):
+        self.database = database
+        self._http = http_client
+
+    def db(self, name, username, password):
+        return self.database
+
+
+def get_db(rows=None, failures=(), **options) -> DB:
+    return DB('test', 'root', '', client=FakeClient(FakeDatabase(rows, failures)), **options)
+
+
+def test_client_options_are_not_combined():
+    with pytest.raises(ValueError):
+        get_db(hosts='http://other:8529')
+
+    with pytest.raises(ValueError):
+        get_db(codec='json')
+
+    assert get_db().db.calls == []
+
+
+def test_pooled_http_client():
+    adapter = PooledHTTPClient(host_pools=2, max_connections_per_host=5).create_session('host').get_adapter('http://')
+
+    assert adapter._pool_connections == 2
+    assert adapter._pool_maxsize == 5
+
+
+def test_add_many_sends_every_chunk():
+    db = get_db(failures={'b'})
+    companies = [Company(name, 1, 'fin') for name in 'abcde']
+
+    with pytest.raises(BulkInsertError) as e:
+        db.add_many(companies, chunk_size=2)
+
+    assert [len(documents) for _, _, documents in db.db.calls] == [2, 2, 1]
+    assert e.value.documents == [companies[1]]
+    assert [company._id for company in companies] == ['company/1', None, 'company/2', 'company/3', 'company/4']
+
+
+def test_set_many():
+    db = get_db(rows=[[{'index': 0, '_id': 'located_at/1', '_key': '1', '_rev': 'a'},
+                       {'index': 1, '_id': 'located_at/2', '_key': '2', '_rev': 'a'}]])
+    company = Company('acme', 1, 'fin', _id='company/1')
+    located_in = LocatedIn(since=datetime(2020, 1, 1), until=None)
+
+    inserted = db.set_many(LocatedIn, [(company, 'country/1', located_in), (company, 'country/1'),
+                                       ('company/2', 'country/2', {'since': 3})], data={'since': 0},
+                           skip_existing=True)
+
+    _, query_str, bind_vars, _ = db.db.calls[0]
+    assert inserted == 2
+    assert 'FILTER existing._from == edge._from AND existing._to == edge._to' in query_str
+    assert bind_vars == {'edges': [{'_from': 'company/1', '_to': 'country/1', 'since': '2020-01-01 00:00:00',
+                                    'until': None},
+                                   {'since': 3, '_from': 'company/2', '_to': 'country/2'}]}
+    assert located_in._id == 'located_at/1'
+
+
+def test_set_many_without_id():
+    db = get_db()
+
+    with pytest.raises(ValueError):
+        db.set_many(LocatedIn, [(Company('acme', 1, 'fin'), 'country/1')])
+
+    assert db.db.calls == []
+
+
+def test_update_many_changes():
+    db = get_db(failures={'b'})
+    companies = [Company('a', 1, 'fin', _id='company/1', _key='1'), Company('b', 1, 'fin', _id='company/2', _key='2')]
+
+    results = db.update_many(companies, changes=[{'industry': 'tech'}, {'name': 'b'}])
+
+    assert db.db.calls == [('update_many', 'company', [{'industry': 'tech', '_id': 'company/1', '_key': '1'},
+                                                       {'name': 'b', '_id': 'company/2', '_key': '2'}])]
+    assert results[0] == 'rev1' and companies[0]._rev == 'rev1'
+    assert isinstance(results[1], ValueError) and companies[1]._rev is None
+
+
+def get_company_rows(count: int):
+    return [{'_id': f'company/{index}', '_key': str(index), '_rev': 'a', 'name': str(index), 'employee_number': index,
+             'industry': 'fin'} for index in range(count)]
+
+
+@pytest.mark.parametrize('prefetch', [False, True])
+def test_iter_batches(prefetch):
+    db = get_db(rows=[get_company_rows(5)]).with_collections(Company)
+
+    companies = list(db.iter(Company.match(industry='fin'), batch_size=2, prefetch=prefetch))
+
+    _, _, bind_vars, options = db.db.calls[0]
+    assert [company.name for company in companies] == ['0', '1', '2', '3', '4']
+    assert isinstance(companies[0], Company)
+    assert bind_vars == {'p_1': 'fin'}
+    assert options == {'batch_size': 2, 'stream': True, 'ttl': None}
+    assert db.db.cursors[0].fetch_count == 2
+    assert not db.db.cursors[0].closed
+
+
+def test_iter_closes_unfinished_cursor():
+    db = get_db(rows=[get_company_rows(5)]).with_collections(Company)
+
+    results = db.iter(Company.match(), batch_size=2)
+    next(results)
+    results.close()
+
+    assert db.db.cursors[0].closed
+    assert db.db.cursors[0].fetch_count == 0
+
+
+def test_update_many_results_in_order():
+    db = get_db(failures={'b'})
+    documents = [Company('a', 1, 'fin', _id='company/1', _key='1'), Country('b', 'B', _id='country/2', _key='2'),
+                 Company('c', 1, 'fin', _id='company/3', _key='3')]
+
+    results = db.update_many(documents, chunk_size=1)
+
+    assert [(name, [document['_key'] for document in chunk]) for _, name, chunk in db.db.calls] == [
+        ('company', ['1']), ('company', ['3']), ('country', ['2'])]
+    assert results[0] == 'rev1' and results[2] == 'rev2'
+    assert isinstance(results[1], ValueError)
+    assert [document._rev for document in documents] == ['rev1', None, 'rev2']
+
+
+def get_rows_by_name(bind_vars):
+    # the later queries answer first, so the results are gathered out of order
+    index = int(bind_vars['p_1'])
+    time.sleep(0.01 * (5 - index))
+    if index == 3 and bind_vars.get('p_2') == 'fail':
+        return ValueError('query 3 failed')
+
+    return get_company_rows(5)[index:index + 2]
+
+
+def test_get_parallel_keeps_order():
+    db = get_db(rows=get_rows_by_name).with_collections(Company)
+    queries = [Company.match(gt('employee_number', index)) for index in range(5)]
+
+    companies = db.get_parallel(queries)
+    company_lists = db.get_many_parallel(queries)
+
+    assert [company.name for company in companies] == ['0', '1', '2', '3', '4']
+    assert [[company.name for company in company_list] for company_list in company_lists] == [
+        ['0', '1'], ['1', '2'], ['2', '3'], ['3', '4'], ['4']]
+    assert db.get_parallel([]) == []
+
+
+def test_get_parallel_threads_are_bounded_by_pool():
+    running, max_running, lock = [0], [0], threading.Lock()
+
+    def get_rows(bind_vars):
+        with lock:
+            running[0] += 1
+            max_running[0] = max(max_running[0], running[0])
+        time.sleep(0.01)
+        with lock:
+            running[0] -= 1
+        return get_company_rows(1)
+
+    client = FakeClient(FakeDatabase(get_rows), http_client=PooledHTTPClient(max_connections_per_host=2))
+    db = DB('test', 'root', '', client=client).with_collections(Company)
+
+    assert len(db.get_parallel([Company.match(gt('employee_number', index)) for index in range(8)])) == 8
+    assert max_running[0] == 2
+
+
+def test_get_parallel_raises_query_error():
+    db = get_db(rows=get_rows_by_name).with_collections(Company)
+    queries = [Company.match(gt('employee_number', index), industry='fail') for index in range(5)]
+
+    with pytest.raises(ValueError, match='query 3 failed'):
+        db.get_many_parallel(queries, max_workers=2)
+
+
+def test_profile_hooks():
+    profiler = QueryProfiler()
+    db = get_db(rows=[get_company_rows(3), get_company_rows(3)], hooks=[profiler], profile=True)
+    db.with_collections(Company)
+
+    assert db.get(Company.match(industry='fin')).name == '0'
+    assert len(db.get_many(Company.match())) == 3
+
+    first, second = profiler.profiles
+    assert first.bind_vars == {'p_1': 'fin'}
+    assert first.row_count == 1 and second.row_count == 3
+    assert first.stats == {'scannedFull': 0}
+    assert db.db.calls[0][3] == {'profile': True}
+    assert all(profile.compile_time > 0 and profile.execute_time >= 0 for profile in profiler.profiles)
+
+
+def test_no_hooks_skips_profiling():
+    db = get_db(rows=[get_company_rows(1)], profile=True).with_collections(Company)
+
+    db.get_many(Company.match())
+
+    assert db.db.calls[0][3] == {}
@@ -0,0 +1,167 @@
+import pytest
+
+from _query import *
+from test.test_classes import Company, Country, LocatedIn
+from test.test_utility import compare_query
+
+
+def test_dedup_documents():
+    compare_query(
+        query=Company.match().dedup(),
+        query_str='FOR o_p IN company'
+                  '  COLLECT p_distinct = o_p OPTIONS {method: \'hash\'}'
+                  '  RETURN p_distinct',
+        bind_vars={},
+        returns='p_distinct',
+        result=Company
+    )
+
+
+def test_dedup_attribute():
+    compare_query(
+        query=Company.match().industry.dedup(),
+        query_str='FOR o_p IN company'
+                  '  COLLECT p_distinct = o_p.industry OPTIONS {method: \'hash\'}'
+                  '  RETURN p_distinct',
+        bind_vars={},
+        returns='p_distinct',
+        result=VALUE_RESULT
+    )
+
+
+def test_dedup_fields_before_sort_and_limit():
+    compare_query(
+        query=Company.match(industry='fin').dedup('name', 'industry').sort('-employee_number').limit(3),
+        query_str='FOR o_p IN company'
+                  '  FILTER o_p.industry == @p_1'
+                  '  COLLECT p_dedup = [o_p.name, o_p.industry] INTO p_dedup_docs = o_p OPTIONS {method: \'hash\'}'
+                  '  SORT p_dedup_docs[0].employee_number DESC'
+                  '  LIMIT @p_offset, @p_count'
+                  '  RETURN p_dedup_docs[0]',
+        bind_vars={'p_1': 'fin', 'p_offset': 0, 'p_count': 3},
+        returns='p_dedup_docs[0]',
+        result=Company
+    )
+
+
+def test_dedup_edges():
+    compare_query(
+        query=Company.match().out(LocatedIn).dedup('since'),
+        query_str='FOR o_p_0 IN company'
+                  '  FOR p_v, p_e IN 1..1 OUTBOUND o_p_0._id located_at'
+                  '    COLLECT p_dedup = [p_e.since] INTO p_dedup_docs = p_e OPTIONS {method: \'hash\'}'
+                  '    RETURN p_dedup_docs[0]',
+        bind_vars={},
+        returns='p_dedup_docs[0]',
+        result=AnyResult([LocatedIn])
+    )
+
+
+def test_dedup_vertices_before_alias():
+    compare_query(
+        query=Company.match().out(LocatedIn).to(Country).dedup('name').as_var('c').array(
+            Company.match(name=var('c').name)),
+        query_str='FOR o_p_0_0 IN company'
+                  '  FOR p_0_v, p_0_e IN 1..1 OUTBOUND o_p_0_0._id located_at'
+                  '    FILTER IS_SAME_COLLECTION(\'country\', p_0_v)'
+                  '    COLLECT p_0_dedup = [p_0_v.name] INTO p_0_dedup_docs = p_0_v OPTIONS {method: \'hash\'}'
+                  '    LET c = p_0_dedup_docs[0]'
+                  '    LET oqr_p = p_0_dedup_docs[0]'
+                  '    LET array_p = ('
+                  '      FOR o_p_1 IN company'
+                  '        FILTER o_p_1.name == c.name'
+                  '        RETURN o_p_1'
+                  '    )'
+                  '    RETURN array_p',
+        bind_vars={},
+        returns='array_p',
+        result=ListResult(inner_result=Company)
+    )
+
+
+def test_dedup_select():
+    compare_query(
+        query=Company.match().select('industry').dedup(),
+        query_str='FOR o_p_0 IN company'
+                  '  RETURN DISTINCT {'
+                  '    @p_2: (o_p_0.industry)'
+                  '  }',
+        bind_vars={'p_2': 'industry'},
+        returns=None,
+        result=DictResult(display_name_to_result={'industry': VALUE_RESULT})
+    )
+
+
+def test_invalid_dedup():
+    with pytest.raises(ValueError):
+        Company.match().select('industry').dedup('industry')._to_stmt()
+
+    with pytest.raises(ValueError):
+        Company.match().out(LocatedIn).dedup().to(Country)._to_stmt()
+
+
+def test_dedup_within_each_outer_row():
+    compare_query(
+        query=Company.match().as_var('c').array(out(LocatedIn).dedup('since')),
+        query_str='FOR o_p_0 IN company'
+                  '  LET c = o_p_0'
+                  '  LET oqr_p = o_p_0'
+                  '  LET array_p = ('
+                  '    FOR p_1_v, p_1_e IN 1..1 OUTBOUND oqr_p._id located_at'
+                  '      COLLECT p_1_dedup = [p_1_e.since] INTO p_1_dedup_docs = p_1_e OPTIONS {method: \'hash\'}'
+                  '      RETURN p_1_dedup_docs[0]'
+                  '  )'
+                  '  RETURN array_p',
+        bind_vars={},
+        returns='array_p',
+        result=ListResult(inner_result=AnyResult([LocatedIn]))
+    )
+
+
+def test_dedup_after_alias():
+    # the dedup COLLECT would drop the variables set before it
+    with pytest.raises(ValueError, match='after the variables c'):
+        Company.match().as_var('c').out(LocatedIn).dedup('since').select(company=var('c'), e=object)._to_stmt()
+
+    with pytest.raises(ValueError, match='after the variables c'):
+        Company.match().as_var('c').array(out(LocatedIn)).dedup()._to_stmt()
+
+
+def test_dedup_nested_after_alias():
+    with pytest.raises(ValueError, match='after the variables c'):
+        Company.match().as_var('c').out(LocatedIn).to(Country).dedup('name')._to_stmt()
+
+    with pytest.raises(ValueError, match='after the variables e'):
+        Company.match().out(LocatedIn).as_var('e').to(Country).dedup()._to_stmt()
+
+
+def test_dedup_select_before_sort_and_limit():
+    compare_query(
+        query=Company.match().select('industry').sort('-employee_number').dedup().limit(20),
+        query_str='FOR o_p_0 IN company'
+                  '  COLLECT p_row = {'
+                  '    @p_2: (o_p_0.industry)'
+                  '  } AGGREGATE p_sort_0 = MAX(o_p_0.employee_number) OPTIONS {method: \'hash\'}'
+                  '  SORT p_sort_0 DESC'
+                  '  LIMIT @p_offset, @p_count'
+                  '  RETURN p_row',
+        bind_vars={'p_2': 'industry', 'p_offset': 0, 'p_count': 20},
+        returns=None,
+        result=DictResult(display_name_to_result={'industry': VALUE_RESULT})
+    )
+
+
+def test_dedup_group_before_limit():
+    compare_query(
+        query=Company.match().group(count('name')).by('industry').dedup().limit(3),
+        query_str='FOR o_p_0 IN company'
+                  '  COLLECT field_industry = o_p_0.industry INTO groups = KEEP(o_p_0, @p_keep)'
+                  '  COLLECT p_row = {'
+                  '    @p_2: (COUNT(groups[*].name))'
+                  '  } OPTIONS {method: \'hash\'}'
+                  '  LIMIT @p_offset, @p_count'
+                  '  RETURN p_row',
+        bind_vars={'p_keep': ['name'], 'p_2': 'count_name', 'p_offset': 0, 'p_count': 3},
+        returns=None,
+        result=DictResult(display_name_to_result={'count_name': VALUE_RESULT})
+    )
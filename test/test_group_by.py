@@ -49,7 +49,7 @@ def test_group_field_by_field():
     compare_query(
         query=Company.match().group('industry').by('industry'),
         query_str='FOR o_p_0 IN company'
-                  '  COLLECT field_industry=o_p_0.industry INTO groups = o_p_0'
+                  '  COLLECT field_industry=o_p_0.industry'
                   '  RETURN {'
                   '    @p_2: (field_industry)'
                   '  }',
@@ -138,3 +138,22 @@ def test_group_traversal():
                                     'edge_targets': ListResult(AnyResult([Country]))})
     )
 
+
+
+def test_group_keeps_referenced_fields():
+    compare_query(
+        query=Company.match().group('industry', max('employee_number'), count('name')).by('industry'),
+        query_str='''FOR o_p_0 IN company'''
+                  '''  COLLECT field_industry=o_p_0.industry INTO groups = KEEP(o_p_0, @p_keep)'''
+                  '''  RETURN {'''
+                  '''    @p_2: (field_industry),'''
+                  '''    @p_4: (MAX(groups[*].employee_number)),'''
+                  '''    @p_6: (COUNT(groups[*].name))'''
+                  '''  }''',
+        bind_vars={'p_keep': ['employee_number', 'name'], 'p_2': 'industry', 'p_4': 'max_employee_number',
+                   'p_6': 'count_name'},
+        returns=None,
+        result=DictResult(
+            display_name_to_result={'industry': VALUE_RESULT, 'max_employee_number': VALUE_RESULT,
+                                    'count_name': VALUE_RESULT})
+    )
@@ -0,0 +1,154 @@
+import pytest
+
+from _query import *
+from test.test_classes import Company, Country, LocatedIn
+from test.test_utility import compare_query
+
+
+def test_limit():
+    compare_query(
+        query=Company.match().limit(20),
+        query_str='FOR o_p IN company'
+                  '  LIMIT @p_offset, @p_count'
+                  '  RETURN o_p',
+        bind_vars={'p_offset': 0, 'p_count': 20},
+        returns='o_p',
+        result=Company
+    )
+
+
+def test_limit_after_filters():
+    compare_query(
+        query=Company.match(gt('employee_number', 42)).limit(20, offset=40).match(industry='fin'),
+        query_str='FOR o_p IN company'
+                  '  FILTER o_p.employee_number > @p_1'
+                  '  FILTER o_p.industry == @p_2'
+                  '  LIMIT @p_offset, @p_count'
+                  '  RETURN o_p',
+        bind_vars={'p_1': 42, 'p_2': 'fin', 'p_offset': 40, 'p_count': 20},
+        returns='o_p',
+        result=Company
+    )
+
+
+def test_limit_before_alias():
+    compare_query(
+        query=Company.match().limit(5).as_var('a').array(Company.match(industry=var('a').industry).limit(3)),
+        query_str='''FOR o_p_0 IN company'''
+                  '''  LIMIT @p_0_offset, @p_0_count'''
+                  '''  LET a = o_p_0'''
+                  '''  LET oqr_p = o_p_0'''
+                  '''  LET array_p = ('''
+                  '''    FOR o_p_1 IN company'''
+                  '''     FILTER o_p_1.industry == a.industry'''
+                  '''     LIMIT @p_1_offset, @p_1_count'''
+                  '''     RETURN o_p_1'''
+                  '''  )'''
+                  '''  RETURN array_p''',
+        bind_vars={'p_0_offset': 0, 'p_0_count': 5, 'p_1_offset': 0, 'p_1_count': 3},
+        returns='array_p',
+        result=ListResult(inner_result=Company)
+    )
+
+
+def test_limit_edges():
+    compare_query(
+        query=Company.match().limit(10).out(LocatedIn).match(gt('since', 1)).limit(2),
+        query_str='FOR o_p_0 IN company'
+                  '  LIMIT @p_0_offset, @p_0_count'
+                  '  FOR p_v, p_e IN 1..1 OUTBOUND o_p_0._id located_at'
+                  '    FILTER p_e.since > @p_0'
+                  '    LIMIT @p_offset, @p_count'
+                  '    RETURN p_e',
+        bind_vars={'p_0': 1, 'p_offset': 0, 'p_count': 2, 'p_0_offset': 0, 'p_0_count': 10},
+        returns='p_e',
+        result=AnyResult([LocatedIn])
+    )
+
+
+def test_limit_vertices_after_edge_filters():
+    compare_query(
+        query=Company.match().out(LocatedIn).match(gt('since', 1)).to(Country).match(name='Israel').limit(1),
+        query_str='FOR o_p_0 IN company'
+                  '  FOR p_v, p_e IN 1..1 OUTBOUND o_p_0._id located_at'
+                  '    FILTER IS_SAME_COLLECTION(\'country\', p_v)'
+                  '    FILTER p_v.name == @p_1'
+                  '    FILTER p_e.since > @p_2'
+                  '    LIMIT @p_offset, @p_count'
+                  '    RETURN p_v',
+        bind_vars={'p_1': 'Israel', 'p_2': 1, 'p_offset': 0, 'p_count': 1},
+        returns='p_v',
+        result=AnyResult([Country])
+    )
+
+
+def test_limit_group():
+    compare_query(
+        query=Company.match().group('industry').by('industry').limit(3),
+        query_str='FOR o_p_0 IN company'
+                  '  COLLECT field_industry=o_p_0.industry'
+                  '  LIMIT @p_offset, @p_count'
+                  '  RETURN {'
+                  '    @p_2: (field_industry)'
+                  '  }',
+        bind_vars={'p_2': 'industry', 'p_offset': 0, 'p_count': 3},
+        returns=None,
+        result=DictResult(display_name_to_result={'industry': VALUE_RESULT})
+    )
+
+
+def test_limit_select():
+    compare_query(
+        query=Company.match().select('name').limit(3),
+        query_str='FOR o_p_0 IN company'
+                  '  LIMIT @p_offset, @p_count'
+                  '  RETURN {'
+                  '    @p_2: (o_p_0.name)'
+                  '  }',
+        bind_vars={'p_2': 'name', 'p_offset': 0, 'p_count': 3},
+        returns=None,
+        result=DictResult(display_name_to_result={'name': VALUE_RESULT})
+    )
+
+
+def test_invalid_limit():
+    with pytest.raises(ValueError):
+        Company.match().limit('10; REMOVE')
+
+    with pytest.raises(ValueError):
+        Company.match().limit(10, offset=-1)
+
+
+def test_limit_is_left_out_of_filter_subquery():
+    compare_query(
+        query=Company.match(out(LocatedIn).match(gt('since', 1)).sort('since').limit(1, offset=2)),
+        query_str='FOR o_p IN company'
+                  '  LET p_1_sub = ('
+                  '    FOR p_1_v, p_1_e IN 1..1 OUTBOUND o_p._id located_at'
+                  '      FILTER p_1_e.since > @p_1_0'
+                  '      RETURN 1'
+                  '  )'
+                  '  FILTER LENGTH(p_1_sub) > 0'
+                  '  RETURN o_p',
+        bind_vars={'p_1_0': 1},
+        returns='o_p',
+        result=Company
+    )
+
+
+def test_limit_is_left_out_of_target_filter_subquery():
+    compare_query(
+        query=Company.match(out(LocatedIn).limit(1, offset=2).to(Country).match(name='Israel').limit(1, offset=2)),
+        query_str='FOR o_p IN company'
+                  '  LET p_1_sub = ('
+                  '    FOR p_1_v, p_1_e IN 1..1 OUTBOUND o_p._id located_at'
+                  '      FILTER IS_SAME_COLLECTION(\'country\', p_1_v)'
+                  '      FILTER p_1_v.name == @p_1_0'
+                  '      RETURN 1'
+                  '  )'
+                  '  FILTER LENGTH(p_1_sub) > 0'
+                  '  RETURN o_p',
+        bind_vars={'p_1_0': 'Israel'},
+        returns='o_p',
+        result=Company
+    )
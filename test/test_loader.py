@@ -0,0 +1,107 @@
+from dataclasses import dataclass, field
+from typing import List
+
+import pytest
+
+from _collection_definition import collection, edge_collection
+from _compiled import prepare
+from _query import *
+from test.test_classes import Company, Country
+
+COLLECTION_DEFINITION = {'company': Company._get_collection(), 'country': Country._get_collection()}
+
+COMPANY = {'_id': 'company/1', '_key': '1', '_rev': 'a', 'name': 'acme', 'employee_number': 3, 'industry': 'fin'}
+COUNTRY = {'_id': 'country/2', '_key': '2', '_rev': 'b', 'name': 'Israel', 'abbreviation': 'IL'}
+
+
+def test_document_loader():
+    load = DOCUMENT_RESULT._get_loader(COLLECTION_DEFINITION)
+
+    assert load(COMPANY) == DOCUMENT_RESULT._load(COMPANY, COLLECTION_DEFINITION)
+    assert isinstance(load(COUNTRY), Country)
+    assert load({}) == {}
+    assert load({'_id': 'unknown/1'}) == {'_id': 'unknown/1'}
+
+
+def test_nested_loader():
+    result = DictResult({'name': VALUE_RESULT, 'companies': ListResult(DOCUMENT_RESULT),
+                         'countries': AnyResult([Country])})
+    data = {'name': 'fin', 'companies': [COMPANY, COMPANY], 'countries': COUNTRY}
+
+    loaded = result._get_loader(COLLECTION_DEFINITION)(data)
+
+    assert loaded == result._load(data, COLLECTION_DEFINITION)
+    assert all(isinstance(company, Company) for company in loaded['companies'])
+
+
+def test_value_loaders():
+    assert VALUE_RESULT._get_loader(COLLECTION_DEFINITION)(3) == 3
+    assert ListResult(VALUE_RESULT)._get_loader(COLLECTION_DEFINITION)((1, 2)) == [1, 2]
+    assert DictResult({'a': VALUE_RESULT})._get_loader(COLLECTION_DEFINITION)({'a': 1}) == {'a': 1}
+
+
+def test_compiled_loader_is_reused():
+    compiled = prepare(Company.match().out().to()).compiled
+    load = compiled.get_loader(COLLECTION_DEFINITION)
+
+    assert compiled.get_loader(COLLECTION_DEFINITION) is load
+    assert compiled.get_loader(dict(COLLECTION_DEFINITION)) is not load
+    assert isinstance(load(COMPANY), Company)
+
+
+def test_dataclass_document_loader():
+    @collection('company')
+    @dataclass
+    class Company:
+        name: str
+        tags: List[str] = field(default_factory=list)
+        employee_number: int = 0
+
+        def __post_init__(self):
+            self.name = self.name.title()
+
+    company = Company._load({'_id': 'company/1', '_key': '1', '_rev': 'a', 'name': 'acme', 'employee_number': 3,
+                             'extra': 'ignored'}, COLLECTION_DEFINITION)
+
+    assert company == Company('acme', employee_number=3)
+    assert company.name == 'Acme'
+    assert (company._id, company._key, company._rev) == ('company/1', '1', 'a')
+    assert company.tags == [] and company.tags is not Company('a').tags
+    assert not hasattr(company, 'extra')
+
+    with pytest.raises(TypeError):
+        Company._load({'_id': 'company/1'}, COLLECTION_DEFINITION)
+
+
+def test_slots_document_loader():
+    @edge_collection('owns', from_collections=[], to_collections=[], slots=True)
+    @dataclass
+    class Owns:
+        share: float
+
+    owns = Owns._load({'_id': 'owns/1', '_from': 'company/1', '_to': 'company/2', 'share': 0.5}, {})
+
+    assert (owns._from, owns._to, owns._key, owns.share) == ('company/1', 'company/2', None, 0.5)
+
+
+def test_identity_map_loader():
+    identity_map = {}
+    result = DictResult({'companies': ListResult(DOCUMENT_RESULT), 'company': Company})
+    load = result._get_loader(COLLECTION_DEFINITION, identity_map)
+
+    loaded = load({'companies': [COMPANY, COUNTRY, dict(COMPANY)], 'company': COMPANY})
+
+    assert loaded['companies'][0] is loaded['companies'][2] is loaded['company']
+    assert identity_map == {'company/1': loaded['company'], 'country/2': loaded['companies'][1]}
+    assert load({'companies': [], 'company': COMPANY})['company'] is loaded['company']
+    assert result._get_loader(COLLECTION_DEFINITION)({'companies': [], 'company': COMPANY}) is not loaded['company']
+
+
+def test_compiled_loader_per_identity_map():
+    compiled = prepare(Company.match()).compiled
+    identity_map = {}
+    load = compiled.get_loader(COLLECTION_DEFINITION, identity_map)
+
+    assert compiled.get_loader(COLLECTION_DEFINITION, identity_map) is load
+    assert compiled.get_loader(COLLECTION_DEFINITION, {}) is not load
+    assert load(COMPANY) is load(COMPANY) is identity_map['company/1']
@@ -1,3 +1,5 @@
+import pytest
+
 from _query import *
 from test.test_classes import Company
 from test.test_utility import compare_query
@@ -106,3 +108,21 @@ def test_multipltes_matches_and_operators():
         returns='o_p',
         result=Company
     )
+
+
+def test_in():
+    compare_query(
+        query=Company.match(in_('name', ('acme', 'globex')), not_in('industry', {'fin'})),
+        query_str='FOR o_p IN company'
+                  '  FILTER o_p.name IN @p_1'
+                  '  FILTER o_p.industry NOT IN @p_2'
+                  '  RETURN o_p',
+        bind_vars={'p_1': ['acme', 'globex'], 'p_2': ['fin']},
+        returns='o_p',
+        result=Company
+    )
+
+
+def test_in_string():
+    with pytest.raises(TypeError):
+        in_('name', 'acme')
@@ -0,0 +1,105 @@
+from _plan import get_query_plan, PlanIndex, CrossProduct
+
+
+def variable(variable_id, name=None):
+    return {'id': variable_id, 'name': name or f'#{variable_id}'}
+
+
+def reference(variable_id):
+    return {'type': 'reference', 'id': variable_id, 'name': f'#{variable_id}'}
+
+
+def test_set_cross_product():
+    explain_result = {
+        'plan': {
+            'estimatedCost': 120.5,
+            'estimatedNrItems': 100,
+            'rules': ['move-calculations-up'],
+            'nodes': [
+                {'type': 'SingletonNode', 'id': 1},
+                {'type': 'SubqueryStartNode', 'id': 2},
+                {'type': 'EnumerateCollectionNode', 'id': 3, 'collection': 'company',
+                 'outVariable': variable(0, 'o_from_p')},
+                {'type': 'SubqueryEndNode', 'id': 4, 'inVariable': variable(0),
+                 'outVariable': variable(1, 'from_entities')},
+                {'type': 'SubqueryStartNode', 'id': 5},
+                {'type': 'IndexNode', 'id': 6, 'collection': 'company', 'outVariable': variable(2, 'o_to_p'),
+                 'indexes': [{'type': 'primary', 'fields': ['_key']}]},
+                {'type': 'SubqueryEndNode', 'id': 7, 'inVariable': variable(2),
+                 'outVariable': variable(3, 'to_entities')},
+                {'type': 'EnumerateListNode', 'id': 8, 'inVariable': variable(1),
+                 'outVariable': variable(4, 'from_entity')},
+                {'type': 'EnumerateListNode', 'id': 9, 'inVariable': variable(3),
+                 'outVariable': variable(5, 'to_entity')},
+                {'type': 'CalculationNode', 'id': 10, 'outVariable': variable(6),
+                 'expression': {'type': 'object', 'subNodes': [reference(4), reference(5)]}},
+                {'type': 'InsertNode', 'id': 11, 'inVariable': variable(6)},
+            ]
+        },
+        'warnings': []
+    }
+
+    plan = get_query_plan('query', explain_result)
+
+    assert plan.estimated_cost == 120.5
+    assert plan.estimated_items == 100
+    assert plan.rules == ['move-calculations-up']
+    assert plan.full_scans == ['company']
+    assert plan.indexes == [PlanIndex(collection='company', type='primary', fields=['_key'])]
+    assert plan.cross_products == [CrossProduct(outer='from_entity', inner='to_entity')]
+    assert plan.correlated_subqueries == []
+    assert 'cross product of from_entity and to_entity' in plan.warnings
+
+
+def test_existence_subquery():
+    explain_result = {
+        'plan': {
+            'nodes': [
+                {'type': 'SingletonNode', 'id': 1},
+                {'type': 'EnumerateCollectionNode', 'id': 2, 'collection': 'company', 'outVariable': variable(0, 'o_p')},
+                {'type': 'SubqueryNode', 'id': 3, 'outVariable': variable(5, 'p_0_sub'), 'subquery': {'nodes': [
+                    {'type': 'SingletonNode', 'id': 4},
+                    {'type': 'CalculationNode', 'id': 5, 'outVariable': variable(1),
+                     'expression': {'type': 'attribute access', 'subNodes': [reference(0)]}},
+                    {'type': 'TraversalNode', 'id': 6, 'inVariable': variable(1),
+                     'vertexOutVariable': variable(2, 'p_0_v'), 'edgeOutVariable': variable(3, 'p_0_e'),
+                     'indexes': {'base': [{'type': 'edge', 'fields': ['_from'], 'id': 'located_at/2'}],
+                                 'levels': {}}},
+                    {'type': 'ReturnNode', 'id': 7, 'inVariable': variable(3)},
+                ]}},
+                {'type': 'CalculationNode', 'id': 8, 'outVariable': variable(6),
+                 'expression': {'type': 'compare >', 'subNodes': [reference(5)]}},
+                {'type': 'FilterNode', 'id': 9, 'inVariable': variable(6)},
+                {'type': 'ReturnNode', 'id': 10, 'inVariable': variable(0)},
+            ]
+        },
+        'warnings': [{'code': 1, 'message': 'collection used twice'}]
+    }
+
+    plan = get_query_plan('query', explain_result)
+
+    assert plan.correlated_subqueries == ['p_0_sub']
+    assert plan.cross_products == []
+    assert plan.indexes == [PlanIndex(collection='located_at', type='edge', fields=['_from'])]
+    assert plan.warnings == ['collection used twice', 'full collection scan of company',
+                             'subquery p_0_sub runs once per row']
+
+
+def test_nested_loops():
+    explain_result = {
+        'plan': {
+            'nodes': [
+                {'type': 'SingletonNode', 'id': 1},
+                {'type': 'EnumerateCollectionNode', 'id': 2, 'collection': 'company', 'outVariable': variable(0, 'a')},
+                {'type': 'IndexNode', 'id': 3, 'collection': 'country', 'outVariable': variable(1, 'b'),
+                 'indexes': [{'type': 'persistent', 'fields': ['name']}],
+                 'condition': {'type': 'n-ary or', 'subNodes': [reference(0)]}},
+                {'type': 'EnumerateCollectionNode', 'id': 4, 'collection': 'country', 'outVariable': variable(2, 'c')},
+            ]
+        }
+    }
+
+    plan = get_query_plan('query', explain_result)
+
+    assert plan.full_scans == ['company', 'country']
+    assert plan.cross_products == [CrossProduct(outer='b', inner='c')]
@@ -0,0 +1,57 @@
+import pytest
+
+from _compiled import prepare, StmtCache
+from _query import param, gt, out
+from test.test_classes import Company, LocatedIn
+
+
+def test_prepare_param():
+    prepared = prepare(Company.match(name=param('name')))
+
+    assert prepared.compiled.query_str.replace(' ', '').replace('\n', '') == 'FORo_pINcompanyFILTERo_p.name==@p_1RETURNo_p'
+    assert prepared.compiled.result == Company
+    assert prepared.params == ['name']
+    assert prepared.bind({'name': 'first'}) == {'p_1': 'first'}
+    assert prepared.bind({'name': 'second'}) == {'p_1': 'second'}
+
+
+def test_prepare_keeps_fixed_values():
+    prepared = prepare(Company.match(gt('employee_number', 10), industry=param('industry')))
+
+    assert prepared.bind({'industry': 'fin'}) == {'p_1': 10, 'p_2': 'fin'}
+
+
+def test_prepare_same_param_twice():
+    prepared = prepare(Company.match(name=param('value')).out(LocatedIn).match(gt('since', param('value'))))
+
+    assert prepared.params == ['value']
+    assert set(prepared.bind({'value': 1}).values()) == {1}
+
+
+def test_prepare_traversal():
+    prepared = prepare(Company.match(name=param('name')).array(out(LocatedIn)))
+
+    assert prepared.bind({'name': 'first'}) == {'p_0_1': 'first'}
+
+
+def test_prepare_missing_param():
+    prepared = prepare(Company.match(name=param('name')))
+
+    with pytest.raises(ValueError):
+        prepared.bind({})
+
+
+def test_cache_binds_params():
+    cache = StmtCache()
+    first, bind_vars = cache.get(Company.match(name=param('name'), industry='fin'), params={'name': 'first'})
+    second, _ = cache.get(Company.match(name=param('name'), industry='tech'), params={'name': 'second'})
+
+    assert first is second
+    assert bind_vars == {'p_1': 'first', 'p_2': 'fin'}
+
+
+def test_prepare_limit_params():
+    prepared = prepare(Company.match(industry='fin').limit(param('count'), offset=param('offset')))
+
+    assert prepared.params == ['offset', 'count']
+    assert prepared.bind({'count': 10, 'offset': 20}) == {'p_1': 'fin', 'p_offset': 20, 'p_count': 10}
@@ -0,0 +1,209 @@
+from dataclasses import dataclass
+from typing import List
+
+import pytest
+
+from _collection_definition import collection
+from _session import Session, IdentityMap
+from test.test_classes import Company, LocatedIn
+
+COMPANY = {'_id': 'company/1', '_key': '1', '_rev': 'a', 'name': 'acme', 'employee_number': 3, 'industry': 'fin'}
+
+
+class RecordingDB:
+    def __init__(self):
+        self.calls = []
+        self.failing = True
+
+    def add_many(self, documents, chunk_size):
+        self.calls.append(('add_many', [document.name for document in documents]))
+        for document in documents:
+            if document.name == 'fail':
+                raise ValueError('insert failed')
+            document._set_meta(_id=f'company/{document.name}', _key=document.name, _rev='a')
+
+    def update_many(self, documents, chunk_size, changes):
+        self.calls.append(('update_many', changes))
+        results = []
+        for document in documents:
+            if document.name == 'fail' and self.failing:
+                results.append(ValueError('update failed'))
+                continue
+            document._rev = 'b'
+            results.append('b')
+        return results
+
+    def set(self, from_, edge_document, to_, data):
+        self.calls.append(('set', to_))
+        if to_ == 'country/fail' and self.failing:
+            raise ValueError('set failed')
+
+    def set_many(self, edge_document, pairs, chunk_size):
+        self.calls.append(('set_many', edge_document, pairs))
+        if self.failing and any(to_ == 'country/fail' for _, to_, _ in pairs):
+            raise ValueError('set failed')
+
+
+@collection('tagged')
+@dataclass
+class Tagged:
+    name: str
+    tags: List[str]
+
+
+def test_identity_map_changes():
+    identity_map = IdentityMap()
+    company = identity_map['company/1'] = Company._load(COMPANY, {})
+
+    assert identity_map.get_changes('company/1') == {}
+
+    company.name = 'other'
+    company._rev = 'b'
+
+    assert identity_map.get_changes('company/1') == {'name': 'other'}
+
+    identity_map.pop('company/1')
+    assert identity_map.snapshots == {}
+
+
+def test_flush():
+    db = RecordingDB()
+    session = Session(db)
+    loaded = session.identity_map['company/1'] = Company._load(COMPANY, {})
+    unchanged = session.identity_map['company/2'] = Company._load({**COMPANY, '_id': 'company/2'}, {})
+    detached = Company._load({**COMPANY, '_id': 'company/3', '_key': '3'}, {})
+
+    with session:
+        new = session.add(Company('new', 1, 'tech'))
+        loaded.employee_number = 4
+        session.update(detached)
+        session.update(unchanged)
+        session.set(new, LocatedIn, 'country/1', {'since': 1})
+
+    assert db.calls == [
+        ('add_many', ['new']),
+        ('update_many', [{'employee_number': 4}, {'_key': '3', '_id': 'company/3', '_rev': 'a', 'name': 'acme',
+                                                  'employee_number': 3, 'industry': 'fin'}]),
+        ('set_many', LocatedIn, [(new, 'country/1', {'since': 1})]),
+    ]
+    assert len(session) == 0
+
+
+def test_flush_refreshes_snapshots():
+    db = RecordingDB()
+    session = Session(db)
+    loaded = session.identity_map['company/1'] = Company._load(COMPANY, {})
+
+    loaded.industry = 'tech'
+    session.flush()
+    session.flush()
+
+    assert db.calls == [('update_many', [{'industry': 'tech'}])]
+    assert session.get_document('company/1') is loaded
+
+
+def test_flush_failure_keeps_only_new_documents_not_inserted():
+    db = RecordingDB()
+    session = Session(db)
+    inserted = session.add(Company('inserted', 1, 'fin'))
+    session.add(Company('fail', 1, 'fin'))
+
+    with pytest.raises(ValueError):
+        session.flush()
+
+    db.calls.clear()
+    session._new[0].name = 'retried'
+    session.flush()
+
+    assert db.calls == [('add_many', ['retried'])]
+    assert session.get_document('company/inserted') is inserted
+
+
+def test_exit_clears_after_failed_flush():
+    db = RecordingDB()
+    session = Session(db)
+
+    with pytest.raises(ValueError):
+        with session:
+            session.add(Company('fail', 1, 'fin'))
+            session.update(Company._load(COMPANY, {}))
+
+    assert not session._new and not session._updated
+
+
+def test_update_records_document_once():
+    db = RecordingDB()
+    session = Session(db)
+    detached = Company._load(COMPANY, {})
+
+    dump = detached._dump()
+    session.update(detached)
+    session.update(detached)
+    session.flush()
+
+    assert db.calls == [('update_many', [dump])]
+
+
+def test_identity_map_changes_in_place():
+    identity_map = IdentityMap()
+    tagged = identity_map['tagged/1'] = Tagged._load({'_id': 'tagged/1', '_key': '1', 'name': 'a', 'tags': ['x']}, {})
+
+    tagged.tags.append('y')
+
+    assert identity_map.get_changes('tagged/1') == {'tags': ['x', 'y']}
+
+
+def test_flush_failure_keeps_detached_updates_not_sent():
+    db = RecordingDB()
+    session = Session(db)
+    failed = session.update(Company._load({**COMPANY, 'name': 'fail'}, {}))
+    updated = session.update(Company._load({**COMPANY, '_id': 'company/2', '_key': '2'}, {}))
+
+    with pytest.raises(ValueError):
+        session.flush()
+
+    assert list(session._updated.values()) == [failed]
+    assert session.get_document('company/2') is updated
+
+    db.failing = False
+    db.calls.clear()
+    session.flush()
+
+    assert [[change['name'] for change in changes] for _, changes in db.calls] == [['fail']]
+
+
+def test_flush_failure_keeps_edges_not_sent():
+    db = RecordingDB()
+    session = Session(db, chunk_size=1)
+    query = Company.match(name='acme')
+    session.set(query, LocatedIn, 'country/1')
+    session.set(query, LocatedIn, 'country/fail')
+    session.set('company/1', LocatedIn, 'country/2')
+
+    with pytest.raises(ValueError):
+        session.flush()
+
+    db.failing = False
+    db.calls.clear()
+    session.flush()
+
+    assert db.calls == [('set', 'country/fail'), ('set_many', LocatedIn, [('company/1', 'country/2', {})])]
+    assert session._edges == []
+
+
+def test_flush_failure_keeps_edge_chunks_not_sent():
+    db = RecordingDB()
+    session = Session(db, chunk_size=1)
+    session.set('company/1', LocatedIn, 'country/1')
+    session.set('company/1', LocatedIn, 'country/fail')
+    session.set('company/1', LocatedIn, 'country/2')
+
+    with pytest.raises(ValueError):
+        session.flush()
+
+    db.failing = False
+    db.calls.clear()
+    session.flush()
+
+    assert db.calls == [('set_many', LocatedIn, [('company/1', 'country/fail', {})]),
+                        ('set_many', LocatedIn, [('company/1', 'country/2', {})])]
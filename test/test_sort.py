@@ -0,0 +1,96 @@
+import pytest
+
+from _query import *
+from test.test_classes import Company, Country, LocatedIn
+from test.test_utility import compare_query
+
+
+def test_sort():
+    compare_query(
+        query=Company.match().sort('name'),
+        query_str='FOR o_p IN company'
+                  '  SORT o_p.name ASC'
+                  '  RETURN o_p',
+        bind_vars={},
+        returns='o_p',
+        result=Company
+    )
+
+
+def test_sort_descending_with_limit():
+    compare_query(
+        query=Company.match(industry='fin').sort('-employee_number', 'name').limit(10),
+        query_str='FOR o_p IN company'
+                  '  FILTER o_p.industry == @p_1'
+                  '  SORT o_p.employee_number DESC, o_p.name ASC'
+                  '  LIMIT @p_offset, @p_count'
+                  '  RETURN o_p',
+        bind_vars={'p_1': 'fin', 'p_offset': 0, 'p_count': 10},
+        returns='o_p',
+        result=Company
+    )
+
+
+def test_sort_edges():
+    compare_query(
+        query=Company.match().out(LocatedIn).sort('-since').limit(1),
+        query_str='FOR o_p_0 IN company'
+                  '  FOR p_v, p_e IN 1..1 OUTBOUND o_p_0._id located_at'
+                  '    SORT p_e.since DESC'
+                  '    LIMIT @p_offset, @p_count'
+                  '    RETURN p_e',
+        bind_vars={'p_offset': 0, 'p_count': 1},
+        returns='p_e',
+        result=AnyResult([LocatedIn])
+    )
+
+
+def test_sort_vertices_after_edge_filters():
+    compare_query(
+        query=Company.match().out(LocatedIn).match(gt('since', 1)).to(Country).sort('name').limit(5),
+        query_str='FOR o_p_0 IN company'
+                  '  FOR p_v, p_e IN 1..1 OUTBOUND o_p_0._id located_at'
+                  '    FILTER IS_SAME_COLLECTION(\'country\', p_v)'
+                  '    FILTER p_e.since > @p_1'
+                  '    SORT p_v.name ASC'
+                  '    LIMIT @p_offset, @p_count'
+                  '    RETURN p_v',
+        bind_vars={'p_1': 1, 'p_offset': 0, 'p_count': 5},
+        returns='p_v',
+        result=AnyResult([Country])
+    )
+
+
+def test_sort_select():
+    compare_query(
+        query=Company.match().select('name').sort('-name'),
+        query_str='FOR o_p_0 IN company'
+                  '  SORT o_p_0.name DESC'
+                  '  RETURN {'
+                  '    @p_2: (o_p_0.name)'
+                  '  }',
+        bind_vars={'p_2': 'name'},
+        returns=None,
+        result=DictResult(display_name_to_result={'name': VALUE_RESULT})
+    )
+
+
+def test_sort_group_by_field():
+    compare_query(
+        query=Company.match().group('industry', industry_count=count('industry')).by('industry').sort('-industry'),
+        query_str='FOR o_p_0 IN company'
+                  '  COLLECT field_industry=o_p_0.industry INTO groups = KEEP(o_p_0, @p_keep)'
+                  '  SORT field_industry DESC'
+                  '  RETURN {'
+                  '    @p_2: (field_industry),'
+                  '    @p_4: (COUNT(groups[*].industry))'
+                  '  }',
+        bind_vars={'p_keep': ['industry'], 'p_2': 'industry', 'p_4': 'industry_count'},
+        returns=None,
+        result=DictResult(display_name_to_result={'industry': VALUE_RESULT, 'industry_count': VALUE_RESULT})
+    )
+
+
+def test_sort_group_by_other_field():
+    with pytest.raises(ValueError):
+        Company.match().group('industry').by('industry').sort('name')._to_stmt()
@@ -0,0 +1,136 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from _compiled import StmtCache, get_shape
+from _query import DocumentQuery, gt, in_, like, out, var
+from test.test_classes import Company, Country, LocatedIn
+
+
+def test_same_shape_reuses_compiled_stmt():
+    cache = StmtCache()
+    first, first_bind_vars = cache.get(Company.match(name='first', employee_number=1))
+    second, second_bind_vars = cache.get(Company.match(name='second', employee_number=2))
+
+    assert first is second
+    assert len(cache) == 1
+    assert first_bind_vars == {'p_1': 'first', 'p_2': 1}
+    assert second_bind_vars == {'p_1': 'second', 'p_2': 2}
+    assert first.result == Company
+
+
+def test_different_shape_compiles_again():
+    cache = StmtCache()
+    first, _ = cache.get(Company.match(name='first'))
+    second, _ = cache.get(Company.match(like('name', 'first%')))
+    third, _ = cache.get(Company.match(industry='first'))
+
+    assert first is not second
+    assert first is not third
+    assert len(cache) == 3
+
+
+def test_same_value_in_several_filters():
+    cache = StmtCache()
+    cache.get(Company.match(gt('employee_number', 5), gt('industry', 5)))
+    _, bind_vars = cache.get(Company.match(gt('employee_number', 5), gt('industry', 6)))
+
+    assert bind_vars == {'p_1': 5, 'p_2': 6}
+
+
+def test_var_compare_value_is_part_of_shape():
+    first_shape, first_filters = get_shape(Company.match(industry=var('a').industry))
+    second_shape, second_filters = get_shape(Company.match(industry=var('b').industry))
+
+    assert first_shape != second_shape
+    assert first_filters == second_filters == []
+
+
+def test_traversal_bind_vars():
+    cache = StmtCache()
+    cache.get(Company.match(name='first').out(LocatedIn).match(gt('since', 1)))
+    compiled, bind_vars = cache.get(Company.match(name='second').out(LocatedIn).match(gt('since', 2)))
+
+    assert compiled.query_str.count('@') == 2
+    assert set(bind_vars.values()) == {2, 'second'}
+
+
+def test_unhashable_values_fill_slots():
+    cache = StmtCache()
+    cache.get(Company.match(industry=['fin']))
+    _, bind_vars = cache.get(Company.match(industry={'not': 'hashable'}))
+
+    assert len(cache) == 1
+    assert bind_vars == {'p_1': {'not': 'hashable'}}
+
+
+def test_lru_eviction():
+    cache = StmtCache(max_size=2)
+    first, _ = cache.get(Company.match(name='value'))
+    cache.get(Company.match(industry='value'))
+    cache.get(Company.match(name='value'))
+    cache.get(Company.match(employee_number=1))
+
+    assert len(cache) == 2
+    assert cache.get(Company.match(name='other'))[0] is first
+    assert cache.get(Company.match(industry='other'))[0] is not first
+
+
+def test_in_values_are_one_bind_var():
+    cache = StmtCache()
+    first, first_bind_vars = cache.get(Company.match(in_('name', ['a', 'b'])))
+    second, second_bind_vars = cache.get(Company.match(in_('name', [str(i) for i in range(10000)])))
+
+    assert first is second
+    assert first_bind_vars == {'p_1': ['a', 'b']}
+    assert len(second_bind_vars['p_1']) == 10000
+
+
+def test_pages_share_compiled_stmt():
+    cache = StmtCache()
+    first, first_bind_vars = cache.get(Company.match(industry='fin').sort('name').limit(10))
+    second, second_bind_vars = cache.get(Company.match(industry='fin').sort('name').limit(10, offset=30))
+
+    assert first is second
+    assert len(cache) == 1
+    assert first_bind_vars == {'p_1': 'fin', 'p_offset': 0, 'p_count': 10}
+    assert second_bind_vars == {'p_1': 'fin', 'p_offset': 30, 'p_count': 10}
+
+
+@pytest.mark.parametrize('get_query', [
+    lambda: Company.match().group('industry', 'name').by('industry'),
+    lambda: Company.match().group('name'),
+    lambda: Company.match().select('name', located=out(LocatedIn)),
+    lambda: Company.match().as_var('c').array(out(LocatedIn).to(Country)),
+])
+def test_compiling_twice_keeps_shape(get_query):
+    cache = StmtCache()
+    query = get_query()
+    first, _ = cache.get(query)
+    second, _ = cache.get(query)
+
+    assert first is second
+    assert len(cache) == 1
+
+
+
+@pytest.mark.parametrize('max_size', [0, 128])
+def test_compiling_leaves_query_unchanged(max_size, monkeypatch):
+    # queries run from many threads at once, so compiling must not write into the caller's filters
+    query = Company.match(industry='fin').limit(10, offset=5)
+    _, filters = get_shape(query)
+    values_while_compiling = []
+    to_stmt = DocumentQuery._to_stmt
+
+    def recording_to_stmt(*args, **kwargs):
+        values_while_compiling.append([f.compare_value for f in filters])
+        return to_stmt(*args, **kwargs)
+
+    monkeypatch.setattr(DocumentQuery, '_to_stmt', recording_to_stmt)
+    cache = StmtCache(max_size=max_size)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: cache.get(query)[1], range(32)))
+
+    assert all(bind_vars == {'p_1': 'fin', 'p_offset': 5, 'p_count': 10} for bind_vars in results)
+    assert values_while_compiling and all(values == ['fin', 10, 5] for values in values_while_compiling)
@@ -0,0 +1,101 @@
+from dataclasses import dataclass
+from datetime import datetime
+
+from _collection import persistent_index
+from _collection_definition import edge_collection
+from _query import *
+from test.test_classes import Company
+from test.test_utility import compare_query
+
+
+@edge_collection('owns', from_collections=[Company], to_collections=[Company],
+                 indexes=[persistent_index('_from', 'since')])
+@dataclass
+class Owns:
+    since: datetime
+
+
+def test_edge_filters_on_path_edge():
+    compare_query(
+        query=Company.match().out(Owns).match(gt('since', 1)),
+        query_str='FOR o_p_0 IN company'
+                  '  FOR p_v, p_e, p_p IN 1..1 OUTBOUND o_p_0._id owns'
+                  '    FILTER p_p.edges[0].since > @p_0'
+                  '    RETURN p_e',
+        bind_vars={'p_0': 1},
+        returns='p_e',
+        result=AnyResult([Owns])
+    )
+
+
+def test_edge_filters_on_fixed_depth():
+    compare_query(
+        query=Company.match().out(Owns, min_depth=2, max_depth=2).match(gt('since', 1)),
+        query_str='FOR o_p_0 IN company'
+                  '  FOR p_v, p_e, p_p IN 2..2 OUTBOUND o_p_0._id owns'
+                  '    FILTER p_p.edges[1].since > @p_0'
+                  '    RETURN p_e',
+        bind_vars={'p_0': 1},
+        returns='p_e',
+        result=AnyResult([Owns])
+    )
+
+
+def test_edge_filters_on_depth_range():
+    compare_query(
+        query=Company.match().out(Owns, min_depth=1, max_depth=3).match(gt('since', 1)),
+        query_str='FOR o_p_0 IN company'
+                  '  FOR p_v, p_e IN 1..3 OUTBOUND o_p_0._id owns'
+                  '    FILTER p_e.since > @p_0'
+                  '    RETURN p_e',
+        bind_vars={'p_0': 1},
+        returns='p_e',
+        result=AnyResult([Owns])
+    )
+
+
+def test_vertex_after_edge_filters():
+    compare_query(
+        query=Company.match().out(Owns).match(gt('since', 1)).to(Company).match(industry='fin'),
+        query_str='FOR o_p_0 IN company'
+                  '  FOR p_v, p_e, p_p IN 1..1 OUTBOUND o_p_0._id owns'
+                  '    FILTER IS_SAME_COLLECTION(\'company\', p_v)'
+                  '    FILTER p_v.industry == @p_1'
+                  '    FILTER p_p.edges[0].since > @p_2'
+                  '    RETURN p_v',
+        bind_vars={'p_1': 'fin', 'p_2': 1},
+        returns='p_v',
+        result=AnyResult([Company])
+    )
+
+
+@edge_collection('holds', from_collections=[Company], to_collections=[Company], indexes=[persistent_index('since')])
+@dataclass
+class Holds:
+    since: datetime
+
+
+def test_attribute_index_is_not_vertex_centric():
+    compare_query(
+        query=Company.match().out(Holds).match(gt('since', 1)),
+        query_str='FOR o_p_0 IN company'
+                  '  FOR p_v, p_e IN 1..1 OUTBOUND o_p_0._id holds'
+                  '    FILTER p_e.since > @p_0'
+                  '    RETURN p_e',
+        bind_vars={'p_0': 1},
+        returns='p_e',
+        result=AnyResult([Holds])
+    )
+
+
+def test_index_on_other_direction_is_not_vertex_centric():
+    compare_query(
+        query=Company.match().inbound(Owns).match(gt('since', 1)),
+        query_str='FOR o_p_0 IN company'
+                  '  FOR p_v, p_e IN 1..1 INBOUND o_p_0._id owns'
+                  '    FILTER p_e.since > @p_0'
+                  '    RETURN p_e',
+        bind_vars={'p_0': 1},
+        returns='p_e',
+        result=AnyResult([Owns])
+    )